@@ -5,15 +5,19 @@ from flask_jwt_extended import JWTManager
 from flask_cors import CORS
 from flask_socketio import SocketIO
 from flask_limiter import Limiter
-from flask_limiter.util import get_remote_address
+from app.utils.rate_limit import rate_limit_key, request_cost
+from app.utils.db_routing import RoutingSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 migrate = Migrate()
 jwt = JWTManager()
 socketio = SocketIO()
+# Default limits are in cost units (RATELIMIT_ROUTE_COSTS), sized so a user
+# still gets 50 auction listings an hour at cost 3
 limiter = Limiter(
-    key_func=get_remote_address,
-    default_limits=["200 per day", "50 per hour"]
+    key_func=rate_limit_key,
+    default_limits=["600 per day", "150 per hour"],
+    default_limits_cost=request_cost
 )
 
 
@@ -25,13 +29,57 @@ def create_app(config_name='development'):
     app = Flask(__name__)
     app.config.from_object(config[config_name])
     
+    # Fork the password hashing workers while this is the only thread
+    from app.utils.password_hasher import PasswordHasher, PasswordHashingBusy
+    PasswordHasher.start(app.config)
+    
+    # Time pool checkouts, and give the scheduler and bids their own small pool
+    from app.utils.db_pool import InstrumentedQueuePool, ReservedPool
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = dict(app.config['SQLALCHEMY_ENGINE_OPTIONS'], poolclass=InstrumentedQueuePool)
+    if app.config['DB_RESERVED_POOL_SIZE']:
+        app.config['SQLALCHEMY_BINDS'] = dict(app.config['SQLALCHEMY_BINDS'])
+        app.config['SQLALCHEMY_BINDS'][ReservedPool.BIND] = ReservedPool.bind_options(app.config)
+    
     # Initialize extensions
     db.init_app(app)
     migrate.init_app(app, db)
     jwt.init_app(app)
     CORS(app)
+    
+    # Rate limit counters share the process-wide Redis pool and circuit breaker
+    if app.config['RATELIMIT_STORAGE_URI'].startswith('redis'):
+        from app.utils.redis_client import RedisClient
+        app.config['RATELIMIT_STORAGE_OPTIONS'] = {'connection_pool': RedisClient.get_pool(app.config)}
+    
+    # Query counts and timing per request, registered first to see every query
+    from app.utils.query_stats import QueryStats
+    app.before_request(QueryStats.before_request)
+    app.after_request(QueryStats.after_request)
+    
+    # Shed load before doing any other work for the request
+    from app.utils.load_shedding import LoadShedder
+    app.before_request(LoadShedder.before_request)
+    app.teardown_request(LoadShedder.teardown_request)
+    
+    # Registered before the limiter so floods are turned away before the Redis check
+    from app.utils.rate_limit import LocalRateGuard
+    app.before_request(LocalRateGuard.check_request)
     limiter.init_app(app)
-    socketio.init_app(app, cors_allowed_origins=app.config['SOCKETIO_CORS_ALLOWED_ORIGINS'], async_mode='threading')
+    
+    # Read-only requests may go to a replica
+    from app.utils.db_routing import ReplicaRouter
+    app.before_request(ReplicaRouter.before_request)
+    
+    socketio.init_app(
+        app,
+        cors_allowed_origins=app.config['SOCKETIO_CORS_ALLOWED_ORIGINS'],
+        async_mode=app.config['SOCKETIO_ASYNC_MODE'],
+        message_queue=app.config['SOCKETIO_MESSAGE_QUEUE'],
+        channel=app.config['SOCKETIO_CHANNEL']
+    )
+    
+    from app.utils.socket_limits import SocketBackpressure
+    SocketBackpressure.install(socketio.server.eio, app.config['SOCKET_MAX_OUTBOUND_QUEUE'])
     
     # Setup logging
     from app.utils.logger import setup_logger
@@ -42,8 +90,7 @@ def create_app(config_name='development'):
     
     @jwt.token_in_blocklist_loader
     def check_if_token_revoked(jwt_header, jwt_payload):
-        jti = jwt_payload['jti']
-        return JWTBlacklist.is_token_blacklisted(jti)
+        return JWTBlacklist.is_token_revoked(jwt_payload)
     
     # Register blueprints
     from app.routes.auth import auth_bp
@@ -72,6 +119,10 @@ def create_app(config_name='development'):
     app.register_blueprint(advanced_bp, url_prefix='/api/advanced')
     app.register_blueprint(sellers_bp, url_prefix='/api/sellers')
     
+    # Any route that hashes a password answers 503 when the pool is full
+    from app.routes.auth import busy_response
+    app.register_error_handler(PasswordHashingBusy, lambda e: busy_response())
+    
     # Register socket.io events
     from app.events.socket_events import register_socket_events
     register_socket_events(socketio)
@@ -81,9 +132,26 @@ def create_app(config_name='development'):
         from app.utils.scheduler import start_scheduler
         start_scheduler(app)
     
-    # Create tables
+    # Create tables and make sure the current notification partitions exist
     with app.app_context():
-        db.create_all()
+        # Flag requests that keep a pooled connection during Cloudinary/NHTSA calls
+        from app.utils.db_pool import PoolMonitor
+        for key, engine in db.engines.items():
+            PoolMonitor.install(engine, key or 'primary')
+            QueryStats.install(engine)
+        
+        db.create_all(bind_key=None)  # Primary only, replicas follow it
+        
+        from app.utils.notification_retention import NotificationRetentionService
+        NotificationRetentionService.ensure_partitions()
+    
+    # Start outbox dispatcher (safe to run in every process)
+    from app.utils.outbox import OutboxService
+    if not os.getenv('SKIP_OUTBOX_DISPATCHER'):
+        OutboxService.start_dispatcher(app)
+    
+    # Replica lag checks (nothing to do without DATABASE_REPLICA_URLS)
+    ReplicaRouter.start_monitor(app)
     
     # Register CLI commands
     from app.cli import register_cli_commands
@@ -92,7 +160,23 @@ def create_app(config_name='development'):
     # Health check endpoint
     @app.route('/api/health', methods=['GET'])
     def health():
-        return {'status': 'healthy'}, 200
+        return {
+            'status': 'healthy',
+            'node_id': app.config['NODE_ID'],
+            'socketio': {
+                'async_mode': socketio.async_mode,
+                'message_queue': bool(app.config['SOCKETIO_MESSAGE_QUEUE']),
+                # Long-polling clients send every request of a session to the node
+                # that holds it, so load balancers must pin sessions to a node
+                'sticky_sessions': 'required unless clients connect with transports=["websocket"]'
+            }
+        }, 200, {'X-Node-Id': app.config['NODE_ID']}
+    
+    # Prometheus metrics endpoint
+    @app.route('/api/metrics', methods=['GET'])
+    def metrics():
+        from app.utils.metrics import Metrics
+        return Metrics.render(), 200, {'Content-Type': 'text/plain; version=0.0.4'}
     
     # Serve uploaded images
     @app.route('/uploads/<path:filename>')
@@ -150,3 +150,64 @@ def register_cli_commands(app):
         except Exception as e:
             db.session.rollback()
             click.secho(f'❌ Error: {str(e)}', fg='red')
+    
+    @app.cli.command('partition-notifications')
+    def partition_notifications():
+        """Convert an existing notifications table to monthly partitions"""
+        from app.utils.notification_retention import NotificationRetentionService
+        
+        try:
+            if NotificationRetentionService.is_partitioned():
+                click.secho('ℹ Notifications table is already partitioned', fg='yellow')
+                return
+            
+            moved = NotificationRetentionService.convert_existing_table()
+            
+            click.secho('✓ Notifications table partitioned successfully', fg='green')
+            click.echo(f'  Rows moved: {moved}')
+            click.echo(f'  Partitions: {len(NotificationRetentionService.list_partitions())}')
+        
+        except Exception as e:
+            db.session.rollback()
+            click.secho(f'❌ Error: {str(e)}', fg='red')
+    
+    @app.cli.command('notification-retention')
+    def notification_retention():
+        """Create upcoming notification partitions and expire old ones now"""
+        from app.utils.notification_retention import NotificationRetentionService
+        
+        try:
+            NotificationRetentionService.ensure_partitions()
+            expired = NotificationRetentionService.apply_retention()
+            
+            click.secho('✓ Notification retention applied', fg='green')
+            click.echo(f'  Expired partitions: {", ".join(expired) if expired else "none"}')
+        
+        except Exception as e:
+            db.session.rollback()
+            click.secho(f'❌ Error: {str(e)}', fg='red')
+    
+    @app.cli.command('run-worker')
+    def run_worker():
+        """Run the scheduler and outbox dispatcher without serving sockets
+        
+        Emits from this process are published to SOCKETIO_MESSAGE_QUEUE and
+        delivered by the web nodes. Start web nodes with SKIP_SCHEDULER=1 (and
+        optionally SKIP_OUTBOX_DISPATCHER=1) so the jobs run only here.
+        """
+        import time
+        from app.utils.outbox import OutboxService
+        from app.utils.scheduler import start_scheduler
+        
+        if not app.config['SOCKETIO_MESSAGE_QUEUE']:
+            click.secho('⚠ SOCKETIO_MESSAGE_QUEUE is not set; socket events from this worker will not reach clients', fg='yellow')
+        
+        start_scheduler(app)
+        OutboxService.start_dispatcher(app)
+        click.secho(f'✓ Worker {app.config["NODE_ID"]} running (Ctrl+C to stop)', fg='green')
+        
+        try:
+            while True:
+                time.sleep(60)
+        except KeyboardInterrupt:
+            click.echo('Worker stopped')
@@ -1,44 +1,139 @@
-from flask import request
-from flask_socketio import emit, join_room, leave_room, rooms
+import logging
+import time
+from flask import request, session
+from flask_jwt_extended import decode_token
+from flask_socketio import ConnectionRefusedError, emit, join_room, leave_room, rooms
+from app import db
+from app.models.auction import Auction
+from app.utils.auction_broadcaster import AuctionBroadcaster
+from app.utils.bid_service import BidService
+from app.utils.db_pool import ReservedPool
+from app.utils.jwt_blacklist import JWTBlacklist
+from app.utils.presence import AuctionPresence, TypingIndicator, UserPresence
+from app.utils.rate_limit import BID_RATE_LIMIT, hit_route_limit
+from app.utils.socket_encoding import STATE_FIELDS, SocketEncoding
+from app.utils.socket_limits import SocketRateLimiter
+
+
+logger = logging.getLogger(__name__)
 
 
 def register_socket_events(socketio):
     """Register all Socket.io events"""
     
     @socketio.on('connect')
-    def handle_connect():
-        """Handle client connection"""
-        print(f'Client {request.sid} connected')
-        emit('connection_response', {
+    def handle_connect(auth=None):
+        """Handle client connection
+        
+        Clients may authenticate by passing their access token as
+        ``auth={'token': ...}``; tokens are not read from the query string,
+        which ends up in proxy and access logs. The identity is verified
+        here and kept on the socket session, and the socket joins the user's
+        ``user_{id}`` room for personal notifications.
+        Anonymous connections can still follow auctions but cannot bid. An
+        invalid or revoked token refuses the connection.
+        """
+        token = (auth or {}).get('token')
+        session['encoding'] = SocketEncoding.negotiate(
+            (auth or {}).get('encoding') or request.args.get('encoding')
+        )
+        if token:
+            try:
+                claims = decode_token(token)
+            except Exception:
+                raise ConnectionRefusedError('Invalid token')
+            if claims.get('type') != 'access' or JWTBlacklist.is_token_revoked(claims):
+                raise ConnectionRefusedError('Invalid token')
+            session['user_id'] = int(claims['sub'])
+            session['role'] = claims.get('role')
+            session['token_exp'] = claims.get('exp')
+            session['token_claims'] = {name: claims.get(name) for name in ('jti', 'type', 'sub', 'iat')}
+            
+            # Personal notifications are emitted to user_{id}
+            join_room(f"user_{session['user_id']}")
+            UserPresence.connect(session['user_id'])
+        
+        logger.debug(f'Client {request.sid} connected')
+        response = {
             'message': 'Connected to auction server',
-            'data': 'Connected'
-        })
+            'data': 'Connected',
+            'encoding': session['encoding']
+        }
+        if session['encoding'] != 'json':
+            response['state_fields'] = STATE_FIELDS
+        emit('connection_response', response)
     
     @socketio.on('disconnect')
-    def handle_disconnect():
+    def handle_disconnect(reason=None):
         """Handle client disconnection"""
-        print(f'Client {request.sid} disconnected')
+        AuctionPresence.disconnect(request.sid)
+        SocketRateLimiter.forget(request.sid)
+        if session.get('user_id') is not None:
+            UserPresence.disconnect(session['user_id'])
+        logger.debug(f'Client {request.sid} disconnected')
     
     @socketio.on('join_auction')
+    @SocketRateLimiter.limited('join_auction')
     def on_join_auction(data):
-        """Join an auction room to receive real-time updates"""
+        """Join an auction room to receive real-time updates
+        
+        Clients that have seen events before send the highest ``seq`` they
+        received as ``last_seq``. The reply is an ``auction_sync`` event with
+        either the missed events or a full snapshot of the auction.
+        """
         auction_id = data.get('auction_id')
+        last_seq = data.get('last_seq')
         
         if not auction_id:
             emit('error', {'message': 'auction_id is required'})
             return
         
+        if last_seq is not None and not isinstance(last_seq, int):
+            emit('error', {'message': 'last_seq must be an integer'})
+            return
+        
+        auction = Auction.query.get(auction_id)
+        if not auction:
+            emit('error', {'message': 'Auction not found'})
+            return
+        
+        # Join before reading the buffer so nothing published in between is lost
         room = f'auction_{auction_id}'
         join_room(room)
+        join_room(SocketEncoding.state_room(auction.id, session.get('encoding', 'json')))
         
+        events = None
+        if last_seq is not None and last_seq <= auction.event_seq:
+            events = AuctionBroadcaster.events_since(auction.id, last_seq, auction.event_seq)
+        
+        if events is not None:
+            emit('auction_sync', {
+                'auction_id': auction.id,
+                'seq': auction.event_seq,
+                'mode': 'deltas',
+                'events': events
+            })
+        else:
+            emit('auction_sync', {
+                'auction_id': auction.id,
+                'seq': auction.event_seq,
+                'mode': 'snapshot',
+                'snapshot': AuctionBroadcaster.snapshot(auction)
+            })
+        
+        # Acknowledge to the joining client only; the room hears about it
+        # through the throttled viewer_count broadcast
+        AuctionPresence.join(request.sid, auction.id)
         emit('auction_joined', {
             'message': f'Joined auction {auction_id}',
-            'auction_id': auction_id
-        }, room=room)
+            'auction_id': auction_id,
+            'viewers': AuctionPresence.local_count(auction.id)
+        })
         
-        print(f'Client {request.sid} joined auction {auction_id}')
+        logger.debug(f'Client {request.sid} joined auction {auction_id}')
     
     @socketio.on('leave_auction')
+    @SocketRateLimiter.limited('leave_auction')
     def on_leave_auction(data):
         """Leave an auction room"""
         auction_id = data.get('auction_id')
@@ -49,69 +144,86 @@ def register_socket_events(socketio):
         
         room = f'auction_{auction_id}'
         leave_room(room)
+        leave_room(SocketEncoding.state_room(auction_id, session.get('encoding', 'json')))
+        
+        try:
+            AuctionPresence.leave(request.sid, int(auction_id))
+        except (TypeError, ValueError):
+            pass
         
         emit('auction_left', {
             'message': f'Left auction {auction_id}',
             'auction_id': auction_id
-        }, room=room)
+        })
         
-        print(f'Client {request.sid} left auction {auction_id}')
+        logger.debug(f'Client {request.sid} left auction {auction_id}')
     
-    @socketio.on('bid_placed')
-    def on_bid_placed(data):
-        """Handle bid placed event from client (for validation if needed)"""
-        auction_id = data.get('auction_id')
+    @socketio.on('place_bid')
+    @SocketRateLimiter.limited('place_bid')
+    @ReservedPool.use()
+    def on_place_bid(data):
+        """Place a bid over the socket and acknowledge the result to the sender
         
-        if not auction_id:
-            emit('error', {'message': 'auction_id is required'})
-            return
+        Runs the same acceptance logic as ``POST /api/bids/auction/<id>`` and
+        counts against the same per-user rate limit; the room learns about
+        the bid through the regular ``new_bid`` broadcast. The token is
+        checked for revocation on every bid, so a logged-out or demoted
+        user stops bidding without reconnecting.
+        """
+        user_id = session.get('user_id')
+        if user_id is None:
+            return {'success': False, 'message': 'Authentication required', 'status': 401}
         
-        # Broadcast to all clients in the auction room
-        room = f'auction_{auction_id}'
-        emit('bid_update', {
-            'auction_id': auction_id,
-            'bid_amount': data.get('bid_amount'),
-            'user_id': data.get('user_id'),
-            'timestamp': data.get('timestamp')
-        }, room=room)
+        if session.get('token_exp') and session['token_exp'] < time.time():
+            return {'success': False, 'message': 'Token has expired, reconnect with a new token', 'status': 401}
         
-        print(f'Bid placed on auction {auction_id}: {data.get("bid_amount")}')
-    
-    @socketio.on('auction_status_update')
-    def on_auction_status_update(data):
-        """Broadcast auction status updates"""
-        auction_id = data.get('auction_id')
+        if JWTBlacklist.is_token_revoked(session['token_claims']):
+            return {'success': False, 'message': 'Token has been revoked, reconnect with a new token', 'status': 401}
+        
+        if not hit_route_limit(BID_RATE_LIMIT, 'bids.place_bid', f'user:{user_id}'):
+            return {'success': False, 'message': 'Rate limit exceeded', 'status': 429}
         
+        auction_id = (data or {}).get('auction_id')
         if not auction_id:
-            emit('error', {'message': 'auction_id is required'})
-            return
+            return {'success': False, 'message': 'auction_id is required', 'status': 400}
         
-        room = f'auction_{auction_id}'
-        emit('status_changed', {
-            'auction_id': auction_id,
-            'status': data.get('status'),
-            'message': data.get('message')
-        }, room=room)
+        try:
+            bid, error, status_code = BidService.place_bid(auction_id, user_id, data)
+        except Exception as e:
+            db.session.rollback()
+            return {'success': False, 'message': f'Error placing bid: {str(e)}', 'status': 500}
+        
+        if error:
+            return {'success': False, 'message': error, 'status': status_code}
         
-        print(f'Auction {auction_id} status changed to {data.get("status")}')
+        return {'success': True, 'message': 'Bid placed successfully', 'data': bid.to_dict()}
     
     @socketio.on('typing')
+    @SocketRateLimiter.limited('typing')
     def on_typing(data):
-        """Handle typing events (for future comment feature)"""
-        auction_id = data.get('auction_id')
-        user_id = data.get('user_id')
-        
-        if auction_id:
-            room = f'auction_{auction_id}'
-            emit('user_typing', {
-                'user_id': user_id,
-                'auction_id': auction_id
-            }, room=room, skip_sid=request.sid)
+        """Handle typing events for the auction Q&A
+        
+        Events are only recorded here; the room gets a debounced
+        ``user_typing`` set from TypingIndicator. Anonymous sockets are ignored.
+        """
+        auction_id = (data or {}).get('auction_id')
+        user_id = session.get('user_id')
+        
+        if not auction_id or user_id is None:
+            return
+        
+        try:
+            auction_id = int(auction_id)
+        except (TypeError, ValueError):
+            return
+        
+        TypingIndicator.update(auction_id, user_id, data.get('is_typing', True) is not False)
     
     @socketio.on('error')
+    @SocketRateLimiter.limited('error')
     def handle_error(data):
         """Handle error messages"""
-        print(f'Error from {request.sid}: {data}')
+        logger.warning(f'Error from {request.sid}: {data}')
         emit('error_response', {
             'message': 'Error received',
             'error': data
@@ -120,5 +232,5 @@ def register_socket_events(socketio):
     @socketio.on_error_default
     def default_error_handler(e):
         """Default error handler"""
-        print(f'Socket.io error: {str(e)}')
+        logger.error(f'Socket.io error: {str(e)}')
         emit('error', {'message': 'An error occurred', 'error': str(e)})
@@ -10,6 +10,7 @@ from app.models.notification import Notification
 from app.models.seller_rating import SellerRating
 from app.models.watchlist import Watchlist
 from app.models.seller import Seller, SellerApprovalLog
+from app.models.outbox import OutboxEvent
 
 __all__ = [
     'User',
@@ -23,5 +24,6 @@ __all__ = [
     'SellerRating',
     'Watchlist',
     'Seller',
-    'SellerApprovalLog'
+    'SellerApprovalLog',
+    'OutboxEvent'
 ]
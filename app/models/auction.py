@@ -24,6 +24,7 @@ class Auction(db.Model):
     view_count = db.Column(db.Integer, default=0)  # Track views
     watch_count = db.Column(db.Integer, default=0)  # Track watchers
     auto_extend = db.Column(db.Boolean, default=True)  # Auto-extend on last-minute bids
+    event_seq = db.Column(db.Integer, default=0, server_default='0', nullable=False)  # Last real-time event sequence
     created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     ends_at = db.Column(db.DateTime, nullable=False, index=True)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -6,7 +6,7 @@ class Notification(db.Model):
     """Notification model for user notifications"""
     __tablename__ = 'notifications'
     
-    id = db.Column(db.Integer, primary_key=True)
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
     type = db.Column(db.String(50), nullable=False, index=True)  # image_uploaded, auction_ending, bid_placed, etc.
     title = db.Column(db.String(200), nullable=False)
@@ -14,9 +14,24 @@ class Notification(db.Model):
     related_auction_id = db.Column(db.Integer, db.ForeignKey('auctions.id'), nullable=True, index=True)
     related_image_id = db.Column(db.Integer, db.ForeignKey('car_images.id'), nullable=True)
     is_read = db.Column(db.Boolean, default=False, index=True)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    digest_window = db.Column(db.DateTime, nullable=True)  # Start of the coalescing window for digest rows
+    digest_count = db.Column(db.Integer, default=1, server_default='1', nullable=False)  # Events folded into this row
+    created_at = db.Column(db.DateTime, primary_key=True, default=datetime.utcnow, index=True)  # Partition key
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    # The table is range-partitioned by month on created_at (see
+    # NotificationRetentionService), so the primary key and every unique
+    # constraint include it. Digest rows are upserted on uq_notification_digest;
+    # regular rows leave digest_window NULL so they never collide.
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'related_auction_id', 'type', 'digest_window', 'created_at',
+                            name='uq_notification_digest'),
+        db.Index('idx_notifications_user_created', user_id, created_at.desc()),
+        db.Index('idx_notifications_unread', user_id, created_at.desc(),
+                 postgresql_where=db.text('is_read = false')),
+        {'postgresql_partition_by': 'RANGE (created_at)'},
+    )
+    
     # Relationships
     user = db.relationship('User', backref='notifications')
     auction = db.relationship('Auction')
@@ -33,6 +48,7 @@ class Notification(db.Model):
             'related_auction_id': self.related_auction_id,
             'related_image_id': self.related_image_id,
             'is_read': self.is_read,
+            'digest_count': self.digest_count,
             'created_at': self.created_at.isoformat(),
             'updated_at': self.updated_at.isoformat()
         }
@@ -0,0 +1,39 @@
+from app import db
+from datetime import datetime
+
+
+class OutboxEvent(db.Model):
+    """Side effect recorded in the same transaction as the change that caused it"""
+    __tablename__ = 'outbox'
+    
+    id = db.Column(db.BigInteger().with_variant(db.Integer, 'sqlite'), primary_key=True)
+    event_type = db.Column(db.String(50), nullable=False)  # socket_emit, notification, watcher_bid, watcher_ending
+    payload = db.Column(db.JSON, nullable=False)
+    status = db.Column(db.String(20), default='pending', nullable=False)  # pending, done, dead
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    last_error = db.Column(db.Text, nullable=True)
+    available_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)  # Next attempt / lease expiry
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    processed_at = db.Column(db.DateTime, nullable=True)
+    
+    # The dispatcher only ever scans pending rows
+    __table_args__ = (
+        db.Index('idx_outbox_pending', 'available_at', 'id',
+                 postgresql_where=db.text("status = 'pending'")),
+    )
+    
+    def to_dict(self):
+        """Convert outbox event to dictionary"""
+        return {
+            'id': self.id,
+            'event_type': self.event_type,
+            'payload': self.payload,
+            'status': self.status,
+            'attempts': self.attempts,
+            'last_error': self.last_error,
+            'created_at': self.created_at.isoformat(),
+            'processed_at': self.processed_at.isoformat() if self.processed_at else None
+        }
+    
+    def __repr__(self):
+        return f'<OutboxEvent {self.id} {self.event_type} ({self.status})>'
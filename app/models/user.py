@@ -1,6 +1,6 @@
 from app import db
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
+from app.utils.password_hasher import PasswordHasher
 
 
 class User(db.Model):
@@ -25,11 +25,31 @@ class User(db.Model):
     
     def set_password(self, password):
         """Hash and set password"""
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = PasswordHasher.hash(password)
     
     def check_password(self, password):
         """Check if provided password matches hash"""
-        return check_password_hash(self.password_hash, password)
+        return PasswordHasher.verify(self.password_hash, password)
+    
+    def rehash_password(self, password):
+        """Re-hash a verified password if the hashing parameters changed
+        
+        Returns:
+            True if password_hash was updated
+        """
+        if not PasswordHasher.needs_rehash(self.password_hash):
+            return False
+        self.set_password(password)
+        return True
+    
+    def token_claims(self):
+        """Claims embedded in access tokens so handlers can authorize without a query"""
+        seller = self.seller_profile[0] if self.seller_profile else None
+        return {
+            'role': self.role,
+            'approved': self.approved,
+            'seller_status': seller.approval_status if seller else None
+        }
     
     def to_dict(self):
         """Convert user to dictionary"""
@@ -14,9 +14,15 @@ class Watchlist(db.Model):
     notify_on_outbid = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
-    # Unique constraint
+    # Unique constraint plus partial indexes backing the watcher fan-out queries
     __table_args__ = (
         db.UniqueConstraint('user_id', 'auction_id', name='unique_user_auction_watch'),
+        db.Index('idx_watch_notify_bid', 'auction_id', 'user_id',
+                 postgresql_where=db.text('notify_on_bid = true')),
+        db.Index('idx_watch_notify_ending', 'auction_id', 'user_id',
+                 postgresql_where=db.text('notify_on_ending = true')),
+        db.Index('idx_watch_notify_outbid', 'auction_id', 'user_id',
+                 postgresql_where=db.text('notify_on_outbid = true')),
     )
     
     # Relationships
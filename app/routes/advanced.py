@@ -5,6 +5,7 @@ from app.models.bid import Bid
 from app.models.auction import Auction
 from app.utils.vin_decoder import VINDecoder
 from app.utils.proxy_bidding import ProxyBiddingService
+from app.utils.db_pool import ReservedPool
 from app.utils.validators import error_response, success_response
 from datetime import datetime, timedelta
 
@@ -34,6 +35,7 @@ def decode_vin(vin):
 @advanced_bp.route('/proxy-bid/auction/<int:auction_id>', methods=['POST'])
 @limiter.limit("30 per hour")
 @jwt_required()
+@ReservedPool.use()
 def place_proxy_bid(auction_id):
     """Place a proxy bid"""
     try:
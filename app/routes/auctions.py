@@ -1,4 +1,6 @@
-from flask import Blueprint, request, jsonify
+import json
+import queue
+from flask import Blueprint, Response, current_app, request, jsonify
 from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
 from sqlalchemy.orm import joinedload
 from app import db, limiter
@@ -7,6 +9,8 @@ from app.models.user import User
 from app.models.car_specification import CarSpecification
 from app.utils.validators import validate_auction_input, error_response, success_response
 from app.utils.decorators import seller_required
+from app.utils.auction_broadcaster import AuctionBroadcaster
+from app.utils.auction_stream import AuctionStreamHub
 from datetime import datetime
 
 auctions_bp = Blueprint('auctions', __name__)
@@ -98,6 +102,58 @@ def get_auction(auction_id):
         return error_response(f'Error retrieving auction: {str(e)}', 500)
 
 
+@auctions_bp.route('/<int:auction_id>/stream', methods=['GET'])
+def stream_auction(auction_id):
+    """Stream auction state as Server-Sent Events
+    
+    Sends a ``snapshot`` event on connect, then the same coalesced
+    ``new_bid`` snapshots as the Socket.io rooms, with the auction ``seq`` as
+    the event id. A comment line is sent every STREAM_HEARTBEAT_SECONDS to
+    keep proxies from closing idle streams.
+    
+    The stream subscribes before the snapshot is read, so no update falls
+    between the two; queued updates the snapshot already covers are skipped.
+    """
+    stream = AuctionStreamHub.subscribe(auction_id)
+    try:
+        auction = Auction.query.get(auction_id)
+        
+        if not auction:
+            AuctionStreamHub.unsubscribe(auction_id, stream)
+            return error_response('Auction not found', 404)
+        
+        snapshot = AuctionBroadcaster.snapshot(auction)
+    
+    except Exception as e:
+        AuctionStreamHub.unsubscribe(auction_id, stream)
+        return error_response(f'Error opening auction stream: {str(e)}', 500)
+    
+    heartbeat = current_app.config.get('STREAM_HEARTBEAT_SECONDS', 15)
+    
+    # The generator runs after the request context is gone, so it must not
+    # touch the database or current_app
+    def generate():
+        try:
+            yield 'retry: 3000\n\n'
+            yield f"id: {snapshot['seq']}\nevent: snapshot\ndata: {json.dumps(snapshot)}\n\n"
+            while True:
+                try:
+                    state = stream.get(timeout=heartbeat)
+                except queue.Empty:
+                    yield ': keep-alive\n\n'
+                    continue
+                if state['seq'] <= snapshot['seq']:
+                    continue
+                yield f"id: {state['seq']}\nevent: new_bid\ndata: {json.dumps(state)}\n\n"
+        finally:
+            AuctionStreamHub.unsubscribe(auction_id, stream)
+    
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+
 @auctions_bp.route('', methods=['POST'])
 @limiter.limit("10 per hour")
 @seller_required
@@ -1,14 +1,23 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import create_access_token, create_refresh_token, get_jwt, verify_jwt_in_request, get_jwt_identity
+from flask_jwt_extended import create_access_token, create_refresh_token, get_jwt, verify_jwt_in_request
 from app import db, limiter
 from app.models.user import User
 from app.utils.validators import validate_user_input, error_response, success_response
 from app.utils.jwt_blacklist import JWTBlacklist
+from app.utils.password_hasher import PasswordHashingBusy
+from app.utils.decorators import get_current_user
 from datetime import timedelta, datetime
 
 auth_bp = Blueprint('auth', __name__)
 
 
+def busy_response():
+    """503 for when the password hashing pool is full"""
+    response, status = error_response('Server is busy, please try again shortly', 503)
+    response.headers['Retry-After'] = '2'
+    return response, status
+
+
 @auth_bp.route('/register', methods=['POST'])
 @limiter.limit("5 per hour")
 def register():
@@ -69,6 +78,9 @@ def register():
             message,
             201
         )
+    except PasswordHashingBusy:
+        db.session.rollback()
+        return busy_response()
     except Exception as e:
         db.session.rollback()
         import traceback
@@ -91,8 +103,16 @@ def login():
     
     user = User.query.filter_by(username=data['username']).first()
     
-    if not user or not user.check_password(data['password']):
-        return error_response('Invalid username or password', 401)
+    try:
+        if not user or not user.check_password(data['password']):
+            return error_response('Invalid username or password', 401)
+        
+        # Upgrade hashes made with older cost parameters while we have the password
+        if user.rehash_password(data['password']):
+            db.session.commit()
+    except PasswordHashingBusy:
+        db.session.rollback()
+        return busy_response()
     
     # Check if user is approved (sellers need approval)
     if user.role == 'seller' and not user.approved:
@@ -101,14 +121,15 @@ def login():
             403
         )
     
-    # Create tokens with role information
+    # Create tokens with role, approval and seller status
+    claims = user.token_claims()
     access_token = create_access_token(
         identity=str(user.id),
-        additional_claims={'role': user.role}
+        additional_claims=claims
     )
     refresh_token = create_refresh_token(
         identity=str(user.id),
-        additional_claims={'role': user.role}
+        additional_claims=claims
     )
     
     return success_response(
@@ -124,15 +145,21 @@ def login():
 @auth_bp.route('/refresh', methods=['POST'])
 @limiter.limit("20 per hour")
 def refresh():
-    """Refresh access token using refresh token"""
+    """Refresh access token using refresh token
+    
+    Claims are read from the database, so this is how clients pick up a
+    role or approval change after their access token was revoked for it.
+    """
     try:
         verify_jwt_in_request(refresh=True)
-        user_id = get_jwt_identity()
-        claims = get_jwt()
+        user = get_current_user()
+        
+        if not user:
+            return error_response('User not found', 401)
         
         new_access_token = create_access_token(
-            identity=str(user_id),
-            additional_claims={'role': claims.get('role', 'user')}
+            identity=str(user.id),
+            additional_claims=user.token_claims()
         )
         
         return success_response(
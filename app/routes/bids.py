@@ -1,13 +1,13 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
 from sqlalchemy.orm import joinedload
-from app import db, socketio, limiter
+from app import db, limiter
 from app.models.bid import Bid
 from app.models.auction import Auction
-from app.utils.validators import validate_bid_input, error_response, success_response
-from app.utils.notification_service import NotificationService
-from config import Config
-from datetime import datetime
+from app.utils.validators import error_response, success_response
+from app.utils.bid_service import BidService
+from app.utils.db_pool import ReservedPool
+from app.utils.rate_limit import BID_RATE_LIMIT
 
 bids_bp = Blueprint('bids', __name__)
 
@@ -49,93 +49,17 @@ def get_auction_bids(auction_id):
 
 
 @bids_bp.route('/auction/<int:auction_id>', methods=['POST'])
-@limiter.limit("30 per hour")
+@limiter.limit(BID_RATE_LIMIT)
+@ReservedPool.use()
 def place_bid(auction_id):
     """Place a bid on an auction"""
     try:
         verify_jwt_in_request()
         user_id = get_jwt_identity()
         
-        auction = Auction.query.get(auction_id)
-        
-        if not auction:
-            return error_response('Auction not found', 404)
-        
-        if auction.status != 'active':
-            return error_response('Auction is not active', 400)
-        
-        if auction.ends_at < datetime.utcnow():
-            auction.status = 'closed'
-            db.session.commit()
-            return error_response('Auction has ended', 400)
-        
-        if auction.seller_id == user_id:
-            return error_response('Sellers cannot bid on their own auctions', 400)
-        
-        data = request.get_json()
-        
-        if not data:
-            return error_response('No data provided', 400)
-        
-        # Validate bid input
-        errors = validate_bid_input(data)
-        if errors:
-            return error_response(', '.join(errors), 400)
-        
-        bid_amount = float(data['bid_amount'])
-        minimum_bid = auction.current_price + Config.MINIMUM_BID_INCREMENT
-        
-        if bid_amount <= auction.current_price:
-            return error_response(
-                f'Bid amount must be greater than current price ({auction.current_price})',
-                400
-            )
-        
-        if bid_amount < minimum_bid:
-            return error_response(
-                f'Bid amount must be at least {minimum_bid} (current: {auction.current_price} + minimum increment: {Config.MINIMUM_BID_INCREMENT})',
-                400
-            )
-        
-        # Create bid
-        bid = Bid(
-            auction_id=auction_id,
-            user_id=user_id,
-            bid_amount=bid_amount
-        )
-        
-        # Update auction's current price
-        auction.current_price = bid_amount
-        
-        db.session.add(bid)
-        db.session.commit()
-        
-        # Send notification to seller
-        NotificationService.notify_bid_placed(
-            seller_id=auction.seller_id,
-            auction_id=auction_id,
-            bidder_username=bid.bidder.username,
-            bid_amount=bid_amount
-        )
-        
-        # Notify previous highest bidder if they are being outbid
-        previous_bids = Bid.query.filter_by(auction_id=auction_id).order_by(Bid.bid_amount.desc()).offset(1).first()
-        if previous_bids:
-            NotificationService.notify_outbid(
-                user_id=previous_bids.user_id,
-                auction_id=auction_id,
-                auction_title=auction.title,
-                current_price=bid_amount
-            )
-        
-        # Emit socket.io event for real-time update
-        socketio.emit('new_bid', {
-            'auction_id': auction_id,
-            'bid_amount': bid_amount,
-            'user_id': user_id,
-            'timestamp': bid.timestamp.isoformat(),
-            'current_price': auction.current_price
-        }, room=f'auction_{auction_id}')
+        bid, error, status_code = BidService.place_bid(auction_id, user_id, request.get_json())
+        if error:
+            return error_response(error, status_code)
         
         return success_response(bid.to_dict(), 'Bid placed successfully', 201)
     
@@ -1,14 +1,14 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
-from app import db, socketio
+from app import db
 from app.models.auction import Auction
 from app.models.car_image import CarImage
 from app.utils.validators import error_response, success_response
 from app.utils.cloudinary_utils import (
-    upload_to_cloudinary, delete_from_cloudinary, 
-    validate_image_file, get_thumbnail_url
+    upload_to_cloudinary, validate_image_file, get_thumbnail_url
 )
-from app.utils.notification_service import NotificationService
+from app.utils.outbox import OutboxService
+from app.utils.auction_broadcaster import AuctionBroadcaster
 from datetime import datetime
 import os
 
@@ -41,7 +41,7 @@ def upload_image(auction_id):
     """Upload an image for an auction using Cloudinary"""
     try:
         verify_jwt_in_request()
-        user_id = get_jwt_identity()
+        user_id = int(get_jwt_identity())
         
         auction = Auction.query.get(auction_id)
         
@@ -51,6 +51,9 @@ def upload_image(auction_id):
         if auction.seller_id != user_id:
             return error_response('Unauthorized to upload images for this auction', 403)
         
+        # Give the connection back to the pool for the duration of the upload
+        db.session.close()
+        
         # Check if file is in request
         if 'image' not in request.files:
             return error_response('No image file provided', 400)
@@ -69,6 +72,13 @@ def upload_image(auction_id):
             # Upload to Cloudinary
             cloudinary_result = upload_to_cloudinary(file, auction_id)
             
+            # The auction may have been deleted while the upload ran
+            auction = Auction.query.get(auction_id)
+            if not auction:
+                OutboxService.enqueue('cloudinary_delete', {'public_id': cloudinary_result['public_id']})
+                db.session.commit()
+                return error_response('Auction not found', 404)
+            
             # Create image record
             image_title = request.form.get('image_title', file.filename)
             is_primary = request.form.get('is_primary', 'false').lower() == 'true'
@@ -88,21 +98,23 @@ def upload_image(auction_id):
             )
             
             db.session.add(car_image)
-            db.session.commit()
+            db.session.flush()
             
-            # Send notification
-            NotificationService.notify_image_uploaded(
+            # Notification and socket event are delivered from the outbox after commit
+            OutboxService.notify(
+                'notify_image_uploaded',
                 user_id=user_id,
                 auction_id=auction_id,
                 image_id=car_image.id,
                 image_title=image_title
             )
             
-            # Emit socket event
-            socketio.emit('image_uploaded', {
+            AuctionBroadcaster.enqueue_event(auction_id, 'image_uploaded', {
                 'auction_id': auction_id,
                 'image': car_image.to_dict()
-            }, room=f'auction_{auction_id}')
+            })
+            
+            db.session.commit()
             
             return success_response(car_image.to_dict(), 'Image uploaded successfully', 201)
         
@@ -180,7 +192,7 @@ def delete_image(image_id):
     """Delete an image"""
     try:
         verify_jwt_in_request()
-        user_id = get_jwt_identity()
+        user_id = int(get_jwt_identity())
         
         image = CarImage.query.get(image_id)
         
@@ -190,18 +202,18 @@ def delete_image(image_id):
         if image.auction.seller_id != user_id:
             return error_response('Unauthorized to delete this image', 403)
         
-        # Delete from Cloudinary
-        if hasattr(image, 'cloudinary_public_id') and image.cloudinary_public_id:
-            delete_from_cloudinary(image.cloudinary_public_id)
-        
         db.session.delete(image)
-        db.session.commit()
         
-        # Emit socket event
-        socketio.emit('image_deleted', {
+        # Cloudinary delete and socket event are delivered from the outbox after commit
+        if image.cloudinary_public_id:
+            OutboxService.enqueue('cloudinary_delete', {'public_id': image.cloudinary_public_id})
+        
+        AuctionBroadcaster.enqueue_event(image.auction_id, 'image_deleted', {
             'auction_id': image.auction_id,
             'image_id': image_id
-        }, room=f'auction_{image.auction_id}')
+        })
+        
+        db.session.commit()
         
         return success_response(None, 'Image deleted successfully')
     
@@ -263,15 +275,15 @@ def reorder_images(auction_id):
                 return error_response(f'Invalid image ID: {image_id}', 400)
             image.display_order = i
         
-        db.session.commit()
-        
         images = auction.images.order_by(CarImage.display_order).all()
         
-        # Emit socket event
-        socketio.emit('images_reordered', {
+        # Socket event is delivered from the outbox after commit
+        AuctionBroadcaster.enqueue_event(auction_id, 'images_reordered', {
             'auction_id': auction_id,
             'images': [img.to_dict() for img in images]
-        }, room=f'auction_{auction_id}')
+        })
+        
+        db.session.commit()
         
         return success_response(
             [img.to_dict() for img in images],
@@ -3,6 +3,7 @@ from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
 from app import db
 from app.models.notification import Notification, NotificationPreference
 from app.utils.notification_service import NotificationService
+from app.utils.preference_cache import NotificationPreferenceCache
 from app.utils.validators import error_response, success_response
 
 notifications_bp = Blueprint('notifications', __name__)
@@ -31,7 +32,7 @@ def get_notifications():
         )
         
         notifications = [n.to_dict() for n in paginated.items]
-        unread_count = Notification.query.filter_by(user_id=user_id, is_read=False).count()
+        unread_count = NotificationService.get_unread_count(user_id)
         
         return success_response({
             'notifications': notifications,
@@ -69,7 +70,7 @@ def get_notification(notification_id):
         verify_jwt_in_request()
         user_id = get_jwt_identity()
         
-        notification = Notification.query.get(notification_id)
+        notification = Notification.query.filter_by(id=notification_id).first()
         
         if not notification:
             return error_response('Notification not found', 404)
@@ -90,7 +91,7 @@ def mark_as_read(notification_id):
         verify_jwt_in_request()
         user_id = get_jwt_identity()
         
-        notification = Notification.query.get(notification_id)
+        notification = Notification.query.filter_by(id=notification_id).first()
         
         if not notification:
             return error_response('Notification not found', 404)
@@ -128,7 +129,7 @@ def delete_notification(notification_id):
         verify_jwt_in_request()
         user_id = get_jwt_identity()
         
-        notification = Notification.query.get(notification_id)
+        notification = Notification.query.filter_by(id=notification_id).first()
         
         if not notification:
             return error_response('Notification not found', 404)
@@ -186,6 +187,7 @@ def update_preferences():
             preference.email_notifications = data['email_notifications']
         
         db.session.commit()
+        NotificationPreferenceCache.invalidate(user_id)
         
         return success_response(preference.to_dict(), 'Preferences updated successfully')
     
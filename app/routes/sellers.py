@@ -1,9 +1,9 @@
 from flask import Blueprint, request, jsonify, current_app
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
 from app import db
-from app.models.user import User
 from app.models.seller import Seller, SellerApprovalLog
 from app.utils.seller_approval_service import SellerApprovalService
+from app.utils.decorators import get_current_user
 from app.utils.validators import error_response, success_response
 import logging
 
@@ -28,7 +28,7 @@ def register_seller():
     """
     try:
         user_id = int(get_jwt_identity())
-        user = User.query.get(user_id)
+        user = get_current_user()
         
         if not user:
             return error_response('User not found', 404)
@@ -94,17 +94,14 @@ def verify_documents(seller_id):
     """
     try:
         user_id = int(get_jwt_identity())
-        user = User.query.get(user_id)
-        
-        if not user:
-            return error_response('User not found', 404)
+        is_admin = get_jwt().get('role') == 'admin'
         
         # Verify ownership or admin
         seller = Seller.query.get(seller_id)
         if not seller:
             return error_response('Seller not found', 404)
         
-        if seller.user_id != user_id and user.role != 'admin':
+        if seller.user_id != user_id and not is_admin:
             return error_response('Unauthorized', 403)
         
         data = request.get_json()
@@ -114,7 +111,7 @@ def verify_documents(seller_id):
         success, message = SellerApprovalService.verify_documents(
             seller_id=seller_id,
             document_paths=document_paths,
-            admin_id=user_id if user.role == 'admin' else None
+            admin_id=user_id if is_admin else None
         )
         
         if success:
@@ -224,17 +221,14 @@ def process_approval(seller_id):
     """
     try:
         user_id = int(get_jwt_identity())
-        user = User.query.get(user_id)
-        
-        if not user:
-            return error_response('User not found', 404)
+        is_admin = get_jwt().get('role') == 'admin'
         
         seller = Seller.query.get(seller_id)
         if not seller:
             return error_response('Seller not found', 404)
         
         # Seller can request their own, or admin can request for any
-        if seller.user_id != user_id and user.role != 'admin':
+        if seller.user_id != user_id and not is_admin:
             return error_response('Unauthorized', 403)
         
         # Process approval
@@ -278,9 +272,8 @@ def manual_approve(seller_id):
     """
     try:
         user_id = int(get_jwt_identity())
-        user = User.query.get(user_id)
         
-        if not user or user.role != 'admin':
+        if get_jwt().get('role') != 'admin':
             return error_response('Admin access required', 403)
         
         seller = Seller.query.get(seller_id)
@@ -320,9 +313,8 @@ def manual_reject(seller_id):
     """
     try:
         user_id = int(get_jwt_identity())
-        user = User.query.get(user_id)
         
-        if not user or user.role != 'admin':
+        if get_jwt().get('role') != 'admin':
             return error_response('Admin access required', 403)
         
         seller = Seller.query.get(seller_id)
@@ -365,9 +357,8 @@ def suspend_seller(seller_id):
     """
     try:
         user_id = int(get_jwt_identity())
-        user = User.query.get(user_id)
         
-        if not user or user.role != 'admin':
+        if get_jwt().get('role') != 'admin':
             return error_response('Admin access required', 403)
         
         seller = Seller.query.get(seller_id)
@@ -406,10 +397,7 @@ def flag_suspicious(seller_id):
     }
     """
     try:
-        user_id = int(get_jwt_identity())
-        user = User.query.get(user_id)
-        
-        if not user or user.role != 'admin':
+        if get_jwt().get('role') != 'admin':
             return error_response('Admin access required', 403)
         
         seller = Seller.query.get(seller_id)
@@ -445,17 +433,14 @@ def get_seller(seller_id):
     """
     try:
         user_id = int(get_jwt_identity())
-        user = User.query.get(user_id)
-        
-        if not user:
-            return error_response('User not found', 404)
+        is_admin = get_jwt().get('role') == 'admin'
         
         seller = Seller.query.get(seller_id)
         if not seller:
             return error_response('Seller not found', 404)
         
         # Only seller themselves or admin can view
-        if seller.user_id != user_id and user.role != 'admin':
+        if seller.user_id != user_id and not is_admin:
             return error_response('Unauthorized', 403)
         
         return success_response({
@@ -475,10 +460,7 @@ def get_approval_logs(seller_id):
     Requires: JWT authentication (admin only)
     """
     try:
-        user_id = int(get_jwt_identity())
-        user = User.query.get(user_id)
-        
-        if not user or user.role != 'admin':
+        if get_jwt().get('role') != 'admin':
             return error_response('Admin access required', 403)
         
         seller = Seller.query.get(seller_id)
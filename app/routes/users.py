@@ -6,7 +6,7 @@ from app.models.user import User
 from app.models.auction import Auction
 from app.models.bid import Bid
 from app.utils.validators import validate_user_input, error_response, success_response
-from app.utils.decorators import admin_required, role_required
+from app.utils.decorators import admin_required, role_required, get_current_user
 
 users_bp = Blueprint('users', __name__)
 
@@ -16,9 +16,7 @@ def get_profile():
     """Get current user's profile"""
     try:
         verify_jwt_in_request()
-        user_id = get_jwt_identity()
-        
-        user = User.query.get(user_id)
+        user = get_current_user()
         
         if not user:
             return error_response('User not found', 404)
@@ -36,7 +34,7 @@ def update_profile():
         verify_jwt_in_request()
         user_id = get_jwt_identity()
         
-        user = User.query.get(user_id)
+        user = get_current_user()
         
         if not user:
             return error_response('User not found', 404)
@@ -94,7 +92,7 @@ def get_dashboard():
         verify_jwt_in_request()
         user_id = get_jwt_identity()
         
-        user = User.query.get(user_id)
+        user = get_current_user()
         
         if not user:
             return error_response('User not found', 404)
@@ -0,0 +1,199 @@
+"""Coalesced real-time auction updates"""
+
+import json
+import logging
+import threading
+from flask import current_app
+from sqlalchemy import update
+from app import db, socketio
+from app.models.auction import Auction
+from app.models.bid import Bid
+from app.utils.auction_stream import AuctionStreamHub
+from app.utils.metrics import Metrics
+from app.utils.outbox import OutboxService
+from app.utils.redis_client import RedisClient
+from app.utils.socket_encoding import SocketEncoding
+
+
+logger = logging.getLogger(__name__)
+
+
+class AuctionBroadcaster:
+    """Send at most one state snapshot per auction room per tick
+    
+    Accepted bids are queued in the outbox together with the auction state
+    they produced. The process that delivers them keeps only the newest
+    snapshot per room and a background task flushes the pending snapshots
+    every ``AUCTION_BROADCAST_TICK_MS``, so a burst of bids costs each viewer
+    one ``new_bid`` message per tick instead of one per bid. Snapshots carry
+    the auction's ``seq`` so clients can drop stale ones; the full bid
+    history stays available from ``GET /api/bids/auction/<id>``.
+    
+    Every event sent to an auction room is stamped with the auction's
+    ``event_seq``, bumped in the transaction that caused it, and appended to
+    a bounded per-auction buffer in Redis (``AUCTION_EVENT_BUFFER_SIZE``).
+    A client rejoining with ``last_seq`` gets the missed events from the
+    buffer, or a full snapshot when the buffer no longer covers the gap.
+    """
+    
+    _pending = {}
+    _lock = threading.Lock()
+    _task = None
+    
+    @staticmethod
+    def enqueue_bid(auction, bid):
+        """Bump the auction sequence and queue a room update for an accepted bid"""
+        auction.event_seq = Auction.event_seq + 1
+        db.session.flush()
+        
+        OutboxService.enqueue('auction_state', {
+            'auction_id': auction.id,
+            'seq': auction.event_seq,
+            'current_price': auction.current_price,
+            'bid_amount': bid.bid_amount,
+            'user_id': int(bid.user_id),
+            'timestamp': bid.timestamp.isoformat(),
+            'bid_count': auction.bids.filter_by(is_retracted=False).count(),
+            'ends_at': auction.ends_at.isoformat()
+        })
+    
+    @staticmethod
+    def enqueue_event(auction_id, event_name, data):
+        """Bump the auction sequence and queue any other auction room event"""
+        seq = db.session.execute(
+            update(Auction)
+            .where(Auction.id == auction_id)
+            .values(event_seq=Auction.event_seq + 1)
+            .returning(Auction.event_seq)
+            .execution_options(synchronize_session=False)
+        ).scalar()
+        
+        OutboxService.enqueue('auction_event', {
+            'auction_id': auction_id,
+            'seq': seq,
+            'event': event_name,
+            'data': data
+        })
+    
+    @staticmethod
+    def snapshot(auction):
+        """Full room state for an auction, in the same shape as new_bid"""
+        leader = auction.bids.filter_by(is_retracted=False).order_by(Bid.bid_amount.desc()).first()
+        return {
+            'auction_id': auction.id,
+            'seq': auction.event_seq,
+            'current_price': auction.current_price,
+            'bid_amount': leader.bid_amount if leader else None,
+            'user_id': leader.user_id if leader else None,
+            'timestamp': leader.timestamp.isoformat() if leader else None,
+            'bid_count': auction.bids.filter_by(is_retracted=False).count(),
+            'ends_at': auction.ends_at.isoformat(),
+            'status': auction.status
+        }
+    
+    @staticmethod
+    def _buffer_key(auction_id):
+        return f"auction_events:{auction_id}"
+    
+    @classmethod
+    def record(cls, auction_id, seq, event_name, data):
+        """Append an event to the auction's replay buffer"""
+        size = current_app.config.get('AUCTION_EVENT_BUFFER_SIZE', 100)
+        ttl = current_app.config.get('AUCTION_EVENT_BUFFER_TTL', 3600)
+        key = cls._buffer_key(auction_id)
+        try:
+            pipe = RedisClient.get_client().pipeline(transaction=False)
+            pipe.rpush(key, json.dumps({'seq': seq, 'event': event_name, 'data': data}))
+            pipe.ltrim(key, -size, -1)
+            pipe.expire(key, ttl)
+            pipe.execute()
+        except Exception as e:
+            logger.error(f"Error buffering auction event: {str(e)}")
+    
+    @classmethod
+    def events_since(cls, auction_id, last_seq, current_seq):
+        """Buffered events after last_seq, or None if the buffer has a gap"""
+        try:
+            raw = RedisClient.get_client().lrange(cls._buffer_key(auction_id), 0, -1)
+        except Exception as e:
+            logger.error(f"Error reading auction events: {str(e)}")
+            return None
+        
+        # Deliveries are at-least-once and may land out of order
+        events = {}
+        for item in raw:
+            buffered = json.loads(item)
+            if buffered['seq'] > last_seq:
+                events[buffered['seq']] = buffered
+        
+        # Return the unbroken run after last_seq; it must reach current_seq
+        replay = []
+        seq = last_seq + 1
+        while seq in events:
+            replay.append(events[seq])
+            seq += 1
+        if seq <= current_seq:
+            return None
+        return replay
+    
+    @classmethod
+    def deliver_event(cls, payload):
+        """Buffer and emit a non-bid auction room event"""
+        data = dict(payload['data'], seq=payload['seq'])
+        cls.record(payload['auction_id'], payload['seq'], payload['event'], data)
+        socketio.emit(payload['event'], data, room=f"auction_{payload['auction_id']}")
+    
+    @classmethod
+    def publish(cls, state):
+        """Stage a snapshot for the next tick (or send it now if ticks are off)"""
+        cls.record(state['auction_id'], state['seq'], 'new_bid', state)
+        
+        tick_ms = current_app.config.get('AUCTION_BROADCAST_TICK_MS', 150)
+        if tick_ms <= 0:
+            cls._emit(state)
+            return
+        
+        with cls._lock:
+            current = cls._pending.get(state['auction_id'])
+            if current is not None:
+                Metrics.inc('auction_broadcast_coalesced_total')
+            if current is None or state['seq'] > current['seq']:
+                cls._pending[state['auction_id']] = state
+            
+            if cls._task is None:
+                cls._task = socketio.start_background_task(cls._run, tick_ms / 1000.0)
+    
+    @classmethod
+    def flush(cls):
+        """Emit every pending snapshot"""
+        with cls._lock:
+            pending, cls._pending = cls._pending, {}
+        for state in pending.values():
+            cls._emit(state)
+        return len(pending)
+    
+    @classmethod
+    def _run(cls, tick):
+        while True:
+            socketio.sleep(tick)
+            try:
+                cls.flush()
+            except Exception as e:
+                logger.error(f"Auction broadcast error: {str(e)}")
+    
+    @staticmethod
+    def _emit(state):
+        # One state room per encoding, each snapshot is encoded once per encoding
+        for encoding in SocketEncoding.available():
+            socketio.emit(
+                'new_bid',
+                SocketEncoding.encode_state(state, encoding),
+                room=SocketEncoding.state_room(state['auction_id'], encoding)
+            )
+        AuctionStreamHub.publish(state)
+        Metrics.inc('auction_broadcast_messages_total')
+
+
+Metrics.describe('auction_broadcast_messages_total', 'Auction room snapshots emitted')
+Metrics.describe('auction_broadcast_coalesced_total', 'Auction updates folded into a pending snapshot')
+
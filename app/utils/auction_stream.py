@@ -0,0 +1,114 @@
+"""In-process fan-out of auction state to Server-Sent Events clients"""
+
+import json
+import logging
+import queue
+import threading
+from flask import current_app
+from app import socketio
+from app.utils.metrics import Metrics
+from app.utils.redis_client import RedisClient
+
+
+logger = logging.getLogger(__name__)
+
+
+class AuctionStreamHub:
+    """Deliver coalesced auction snapshots to SSE streams
+    
+    AuctionBroadcaster publishes every snapshot it emits to the Redis
+    channel ``auction_stream:{id}``. Each process runs one listener
+    (a single pattern subscription) and hands each message to the bounded
+    queues of its local streams for that auction, so Redis traffic does not
+    grow with the number of SSE clients. When Redis is unavailable the
+    snapshot is delivered to local streams directly.
+    """
+    
+    CHANNEL_PREFIX = 'auction_stream:'
+    
+    _streams = {}
+    _lock = threading.Lock()
+    _listener = None
+    
+    @classmethod
+    def subscribe(cls, auction_id):
+        """Register a stream for an auction and return its queue"""
+        stream = queue.Queue(maxsize=current_app.config.get('STREAM_QUEUE_SIZE', 16))
+        with cls._lock:
+            cls._streams.setdefault(auction_id, set()).add(stream)
+            if cls._listener is None:
+                cls._listener = socketio.start_background_task(cls._listen, current_app._get_current_object())
+        return stream
+    
+    @classmethod
+    def unsubscribe(cls, auction_id, stream):
+        """Remove a stream when its client goes away"""
+        with cls._lock:
+            streams = cls._streams.get(auction_id)
+            if streams is not None:
+                streams.discard(stream)
+                if not streams:
+                    del cls._streams[auction_id]
+    
+    @classmethod
+    def client_count(cls):
+        """Open streams in this process"""
+        with cls._lock:
+            return sum(len(streams) for streams in cls._streams.values())
+    
+    @classmethod
+    def publish(cls, state):
+        """Send a snapshot to every process's streams for the auction"""
+        try:
+            RedisClient.get_client().publish(f"{cls.CHANNEL_PREFIX}{state['auction_id']}", json.dumps(state))
+        except Exception as e:
+            logger.error(f"Error publishing auction stream: {str(e)}")
+            cls._fan_out(state['auction_id'], state)
+    
+    @classmethod
+    def _fan_out(cls, auction_id, state):
+        with cls._lock:
+            streams = list(cls._streams.get(auction_id, ()))
+        for stream in streams:
+            # A slow client only ever needs the newest snapshot
+            try:
+                stream.put_nowait(state)
+            except queue.Full:
+                try:
+                    stream.get_nowait()
+                except queue.Empty:
+                    pass
+                try:
+                    stream.put_nowait(state)
+                except queue.Full:
+                    pass
+                Metrics.inc('auction_stream_dropped_total')
+    
+    @classmethod
+    def _listen(cls, app):
+        while True:
+            pubsub = None
+            try:
+                with app.app_context():
+                    pubsub = RedisClient.get_client().pubsub(ignore_subscribe_messages=True)
+                pubsub.psubscribe(f'{cls.CHANNEL_PREFIX}*')
+                while True:
+                    message = pubsub.get_message(timeout=1.0)
+                    if message is None:
+                        socketio.sleep(0)
+                        continue
+                    auction_id = int(message['channel'][len(cls.CHANNEL_PREFIX):])
+                    if auction_id in cls._streams:
+                        cls._fan_out(auction_id, json.loads(message['data']))
+            except Exception as e:
+                logger.error(f"Auction stream listener error: {str(e)}")
+                if pubsub is not None:
+                    try:
+                        pubsub.close()
+                    except Exception:
+                        pass
+                socketio.sleep(5)
+
+
+Metrics.register_gauge('auction_stream_clients', AuctionStreamHub.client_count, 'Open auction SSE streams in this process')
+Metrics.describe('auction_stream_dropped_total', 'Snapshots replaced in a full SSE client queue')
@@ -0,0 +1,100 @@
+"""Bid acceptance shared by the REST and Socket.io paths"""
+
+from datetime import datetime
+from app import db
+from app.models.auction import Auction
+from app.models.bid import Bid
+from app.utils.auction_broadcaster import AuctionBroadcaster
+from app.utils.outbox import OutboxService
+from app.utils.validators import validate_bid_input
+from app.utils.watcher_fanout import WatcherFanoutService
+from config import Config
+
+
+class BidService:
+    """Validate and record bids"""
+    
+    @staticmethod
+    def place_bid(auction_id, user_id, data):
+        """Validate a bid, record it and queue its side effects
+        
+        Returns:
+            Tuple of (bid, error message, HTTP status code); bid is None on error
+        """
+        user_id = int(user_id)
+        auction = Auction.query.get(auction_id)
+        
+        if not auction:
+            return None, 'Auction not found', 404
+        
+        if auction.status != 'active':
+            return None, 'Auction is not active', 400
+        
+        if auction.ends_at < datetime.utcnow():
+            auction.status = 'closed'
+            db.session.commit()
+            return None, 'Auction has ended', 400
+        
+        if auction.seller_id == user_id:
+            return None, 'Sellers cannot bid on their own auctions', 400
+        
+        if not data:
+            return None, 'No data provided', 400
+        
+        # Validate bid input
+        errors = validate_bid_input(data)
+        if errors:
+            return None, ', '.join(errors), 400
+        
+        bid_amount = float(data['bid_amount'])
+        minimum_bid = auction.current_price + Config.MINIMUM_BID_INCREMENT
+        
+        if bid_amount <= auction.current_price:
+            return None, f'Bid amount must be greater than current price ({auction.current_price})', 400
+        
+        if bid_amount < minimum_bid:
+            return (
+                None,
+                f'Bid amount must be at least {minimum_bid} (current: {auction.current_price} + minimum increment: {Config.MINIMUM_BID_INCREMENT})',
+                400
+            )
+        
+        # Leader before this bid, for the outbid notice
+        previous_bid = Bid.query.filter(
+            Bid.auction_id == auction_id,
+            Bid.is_retracted == False
+        ).order_by(Bid.bid_amount.desc()).first()
+        
+        # Create bid
+        bid = Bid(
+            auction_id=auction_id,
+            user_id=user_id,
+            bid_amount=bid_amount
+        )
+        
+        # Update auction's current price
+        auction.current_price = bid_amount
+        
+        db.session.add(bid)
+        db.session.flush()
+        
+        # Side effects are written to the outbox in the same transaction and
+        # delivered by the dispatcher after commit
+        OutboxService.notify(
+            'notify_bid_placed',
+            seller_id=auction.seller_id,
+            auction_id=auction_id,
+            bidder_username=bid.bidder.username,
+            bid_amount=bid_amount
+        )
+        
+        # Outbid and watcher notifications
+        WatcherFanoutService.enqueue_bid(auction_id, user_id, bid_amount,
+                                         previous_bid.user_id if previous_bid else None)
+        
+        # Real-time update for the auction room, coalesced per broadcast tick
+        AuctionBroadcaster.enqueue_bid(auction, bid)
+        
+        db.session.commit()
+        
+        return bid, None, 201
@@ -5,6 +5,7 @@ import cloudinary.uploader
 import cloudinary.api
 import os
 from datetime import datetime
+from app.utils.db_pool import PoolMonitor
 
 # Cloudinary configuration
 def configure_cloudinary():
@@ -75,22 +76,23 @@ def upload_to_cloudinary(file_obj, auction_id, folder='naomi-auction'):
         timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
         public_id = f"{folder}/{auction_id}/{timestamp}"
         
-        result = cloudinary.uploader.upload(
-            file_obj,
-            public_id=public_id,
-            resource_type='auto',
-            quality='auto',
-            fetch_format='auto',
-            eager=[
-                {'width': 1600, 'height': 1200, 'crop': 'fill', 'quality': 'auto', 'fetch_format': 'auto'},
-                {'width': 400, 'height': 300, 'crop': 'fill', 'quality': 'auto', 'fetch_format': 'auto'}
-            ],
-            tags=[f'auction_{auction_id}'],
-            metadata={
-                'auction_id': str(auction_id),
-                'uploaded_at': timestamp
-            }
-        )
+        with PoolMonitor.external_call('cloudinary_upload'):
+            result = cloudinary.uploader.upload(
+                file_obj,
+                public_id=public_id,
+                resource_type='auto',
+                quality='auto',
+                fetch_format='auto',
+                eager=[
+                    {'width': 1600, 'height': 1200, 'crop': 'fill', 'quality': 'auto', 'fetch_format': 'auto'},
+                    {'width': 400, 'height': 300, 'crop': 'fill', 'quality': 'auto', 'fetch_format': 'auto'}
+                ],
+                tags=[f'auction_{auction_id}'],
+                metadata={
+                    'auction_id': str(auction_id),
+                    'uploaded_at': timestamp
+                }
+            )
         
         return {
             'url': result.get('secure_url'),
@@ -109,8 +111,10 @@ def delete_from_cloudinary(public_id):
     """Delete image from Cloudinary"""
     try:
         configure_cloudinary()
-        result = cloudinary.uploader.destroy(public_id)
-        return result.get('result') == 'ok'
+        with PoolMonitor.external_call('cloudinary_destroy'):
+            result = cloudinary.uploader.destroy(public_id)
+        # 'not found' means an earlier attempt already removed it
+        return result.get('result') in ('ok', 'not found')
     except Exception as e:
         print(f'Error deleting from Cloudinary: {str(e)}')
         return False
@@ -0,0 +1,179 @@
+"""Database connection pool instrumentation and the reserved pool"""
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from flask import g, has_app_context, has_request_context, request
+from sqlalchemy import event, exc
+from sqlalchemy.pool import QueuePool
+from app.utils.metrics import Metrics
+
+
+logger = logging.getLogger(__name__)
+
+
+class PoolMonitor:
+    """Track which thread holds which pooled connection
+    
+    Pool checkout and checkin events count the connections each thread (or
+    green thread under eventlet/gevent) currently holds. ``external_call``
+    wraps network calls to other services: entering it while holding a
+    connection logs a warning and counts
+    ``db_connection_held_during_io_total``, because a slow upstream then
+    keeps that connection out of the pool for the whole call. Close the
+    session (``db.session.close()``) before the call and query again after.
+    
+    Installed engines also report their pool occupancy, and pools built as
+    InstrumentedQueuePool report checkouts, time spent waiting for a
+    connection and pool timeouts. The wait of the current request is kept
+    in ``g`` for the load shedder.
+    """
+    
+    _held = {}
+    _engines = {}
+    _lock = threading.Lock()
+    
+    @classmethod
+    def install(cls, engine, name):
+        """Listen to checkouts and checkins on an engine's pool"""
+        cls._engines[name] = engine
+        if event.contains(engine.pool, 'checkout', cls._on_checkout):
+            return
+        event.listen(engine.pool, 'checkout', cls._on_checkout)
+        event.listen(engine.pool, 'checkin', cls._on_checkin)
+    
+    @classmethod
+    def _on_checkout(cls, dbapi_connection, connection_record, connection_proxy):
+        holder = threading.get_ident()
+        connection_record.info['pool_holder'] = holder
+        with cls._lock:
+            cls._held[holder] = cls._held.get(holder, 0) + 1
+    
+    @classmethod
+    def _on_checkin(cls, dbapi_connection, connection_record):
+        holder = connection_record.info.pop('pool_holder', None)
+        if holder is None:
+            return
+        with cls._lock:
+            count = cls._held.get(holder, 0) - 1
+            if count > 0:
+                cls._held[holder] = count
+            else:
+                cls._held.pop(holder, None)
+    
+    @classmethod
+    def held_connections(cls):
+        """Connections checked out by the current thread"""
+        return cls._held.get(threading.get_ident(), 0)
+    
+    @classmethod
+    def pool_name(cls, pool):
+        """Bind key of the installed engine that owns a pool"""
+        for name, engine in list(cls._engines.items()):
+            if engine.pool is pool:
+                return name
+        return 'primary'
+    
+    @classmethod
+    def record_wait(cls, pool, seconds, timed_out=False):
+        """Account for one checkout that waited ``seconds`` for a connection"""
+        pool_name = cls.pool_name(pool)
+        Metrics.inc('db_pool_checkouts_total', pool=pool_name)
+        Metrics.inc('db_pool_wait_seconds_total', seconds, pool=pool_name)
+        if timed_out:
+            Metrics.inc('db_pool_timeouts_total', pool=pool_name)
+        if has_app_context():
+            g.db_pool_wait = g.get('db_pool_wait', 0.0) + seconds
+            if timed_out:
+                g.db_pool_timed_out = True
+    
+    @classmethod
+    def _pool_connections(cls):
+        samples = {}
+        for name, engine in list(cls._engines.items()):
+            pool = engine.pool
+            if not isinstance(pool, QueuePool):
+                continue
+            samples[(('pool', name), ('state', 'checked_out'))] = pool.checkedout()
+            samples[(('pool', name), ('state', 'idle'))] = pool.checkedin()
+            samples[(('pool', name), ('state', 'overflow'))] = max(pool.overflow(), 0)
+        return samples
+    
+    @classmethod
+    @contextmanager
+    def external_call(cls, name):
+        """Mark a block that waits on an external service"""
+        held = cls.held_connections()
+        if held:
+            endpoint = request.endpoint if has_request_context() else 'background'
+            Metrics.inc('db_connection_held_during_io_total', call=name, endpoint=endpoint)
+            logger.warning(f"{endpoint} holds {held} database connection(s) during external call {name}")
+        yield
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that times how long each checkout waits for a connection"""
+    
+    # Log as QueuePool does instead of under the app's DEBUG logger
+    _sqla_logger_namespace = 'sqlalchemy.pool.impl.QueuePool'
+    
+    def _do_get(self):
+        started = time.perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            PoolMonitor.record_wait(self, time.perf_counter() - started, timed_out)
+
+
+class ReservedPool:
+    """Separate small pool for the auction scheduler and bid placement
+    
+    The ``reserved`` bind points at the primary database with its own
+    DB_RESERVED_POOL_SIZE connections and no overflow, so closing auctions
+    and accepting bids never queue behind listing and search traffic for
+    the main pool. Code running inside ``ReservedPool.use()`` (also usable
+    as a decorator) sends all its queries there; see RoutingSession.
+    """
+    
+    BIND = 'reserved'
+    _local = threading.local()
+    
+    @classmethod
+    def bind_options(cls, config):
+        """SQLALCHEMY_BINDS entry for the reserved pool"""
+        options = dict(config['SQLALCHEMY_ENGINE_OPTIONS'])
+        options.update(
+            url=config['SQLALCHEMY_DATABASE_URI'],
+            pool_size=config['DB_RESERVED_POOL_SIZE'],
+            max_overflow=0
+        )
+        return options
+    
+    @classmethod
+    @contextmanager
+    def use(cls):
+        """Run the enclosed queries on the reserved pool"""
+        previous = getattr(cls._local, 'active', False)
+        cls._local.active = True
+        try:
+            yield
+        finally:
+            cls._local.active = previous
+    
+    @classmethod
+    def active(cls):
+        return getattr(cls._local, 'active', False)
+
+
+Metrics.register_gauge('db_pool_connections', PoolMonitor._pool_connections,
+                       'Database pool connections by pool and state')
+Metrics.describe('db_pool_checkouts_total', 'Connections checked out of the database pool')
+Metrics.describe('db_pool_wait_seconds_total', 'Time spent waiting for a database pool connection')
+Metrics.describe('db_pool_timeouts_total', 'Checkouts that gave up after pool_timeout')
+Metrics.describe('db_connection_held_during_io_total',
+                 'External calls made while holding a pooled database connection')
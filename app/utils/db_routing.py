@@ -0,0 +1,162 @@
+"""Route read-only requests to read replicas"""
+
+import logging
+import random
+from flask import current_app, g, has_app_context, has_request_context, request, session as flask_session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, text
+from sqlalchemy.sql import Select
+from app.utils.db_pool import ReservedPool
+from app.utils.metrics import Metrics
+from app.utils.redis_client import RedisClient
+
+
+logger = logging.getLogger(__name__)
+
+# Seconds behind the primary; 0 when the server is not replaying WAL
+REPLICA_LAG_SQL = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+
+
+class ReplicaRouter:
+    """Pick the database for each request
+    
+    Replicas are the ``replica_*`` binds built from DATABASE_REPLICA_URLS.
+    A GET or HEAD request reads from a random replica whose lag, checked
+    every DB_REPLICA_CHECK_INTERVAL seconds, is under
+    DB_REPLICA_MAX_LAG_SECONDS; everything else uses the primary.
+    
+    After a client commits a write (over HTTP or a socket event) it is
+    pinned to the primary for DB_STICKY_SECONDS so it reads its own writes,
+    e.g. the auction page fetched right after place_bid. Pins are kept in
+    Redis so they hold on every node; if Redis is unavailable requests go
+    to the primary.
+    """
+    
+    _lag = {}
+    _monitor = None
+    
+    @staticmethod
+    def replica_keys(config):
+        return [key for key in config.get('SQLALCHEMY_BINDS') or {} if key.startswith('replica_')]
+    
+    @classmethod
+    def healthy_replicas(cls):
+        max_lag = current_app.config.get('DB_REPLICA_MAX_LAG_SECONDS', 5)
+        return [key for key, lag in cls._lag.items() if lag is not None and lag <= max_lag]
+    
+    @staticmethod
+    def _client_key():
+        from app.utils.rate_limit import rate_limit_key
+        user_id = flask_session.get('user_id')  # Socket.IO connections
+        return f'user:{user_id}' if user_id else rate_limit_key()
+    
+    @classmethod
+    def before_request(cls):
+        """Choose a replica for this request, if it may use one"""
+        if request.method not in ('GET', 'HEAD') or not cls.replica_keys(current_app.config):
+            return
+        replicas = cls.healthy_replicas()
+        if not replicas:
+            Metrics.inc('db_requests_routed_total', target='primary_no_replica')
+            return
+        try:
+            sticky = RedisClient.get_client().exists(f'db_sticky:{cls._client_key()}')
+        except Exception as e:
+            logger.debug(f"Sticky check failed, using primary: {str(e)}")
+            sticky = True
+        if sticky:
+            Metrics.inc('db_requests_routed_total', target='primary_sticky')
+            return
+        g.db_replica = random.choice(replicas)
+        Metrics.inc('db_requests_routed_total', target='replica')
+    
+    @classmethod
+    def current_replica(cls):
+        return g.get('db_replica') if has_app_context() else None
+    
+    @classmethod
+    def mark_sticky(cls):
+        """Pin the current client to the primary after a committed write"""
+        g.pop('db_replica', None)
+        if not cls.replica_keys(current_app.config):
+            return
+        seconds = current_app.config.get('DB_STICKY_SECONDS', 10)
+        try:
+            RedisClient.get_client().set(f'db_sticky:{cls._client_key()}', 1, px=int(seconds * 1000))
+        except Exception as e:
+            logger.error(f"Error pinning client to primary: {str(e)}")
+    
+    @classmethod
+    def start_monitor(cls, app):
+        """Start the replica lag check for this process"""
+        if cls._monitor is None and cls.replica_keys(app.config):
+            from app import socketio
+            cls._lag = {key: None for key in cls.replica_keys(app.config)}
+            cls._monitor = socketio.start_background_task(cls._run, app)
+        return cls._monitor
+    
+    @classmethod
+    def _run(cls, app):
+        from app import db, socketio
+        interval = app.config.get('DB_REPLICA_CHECK_INTERVAL', 2)
+        while True:
+            with app.app_context():
+                for key in cls.replica_keys(app.config):
+                    engine = db.engines[key]
+                    try:
+                        with engine.connect() as connection:
+                            if engine.dialect.name == 'postgresql':
+                                lag = float(connection.execute(REPLICA_LAG_SQL).scalar())
+                            else:
+                                connection.execute(text('SELECT 1'))
+                                lag = 0.0
+                    except Exception as e:
+                        logger.error(f"Replica {key} check failed: {str(e)}")
+                        lag = None
+                    cls._lag[key] = lag
+                    Metrics.set_gauge('db_replica_lag_seconds', lag if lag is not None else -1, replica=key)
+            socketio.sleep(interval)
+
+
+class RoutingSession(Session):
+    """Session that sends plain SELECTs to the request's replica
+    
+    Writes, SELECT ... FOR UPDATE, raw SQL and any read after the session
+    has flushed stay on the primary. Inside ``ReservedPool.use()`` every
+    statement goes to the reserved pool of the primary instead.
+    """
+    
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and ReservedPool.active() and ReservedPool.BIND in self._db.engines:
+            return self._db.engines[ReservedPool.BIND]
+        if bind is None and isinstance(clause, Select) and clause._for_update_arg is None \
+                and not self._flushing and not self.info.get('db_wrote'):
+            replica = ReplicaRouter.current_replica()
+            if replica is not None:
+                return self._db.engines[replica]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _mark_wrote(session, flush_context):
+    session.info['db_wrote'] = True
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _pin_after_write(session):
+    if session.info.pop('db_wrote', False) and has_request_context():
+        ReplicaRouter.mark_sticky()
+
+
+@event.listens_for(RoutingSession, 'after_rollback')
+def _clear_wrote(session):
+    session.info.pop('db_wrote', None)
+
+
+Metrics.describe('db_requests_routed_total', 'Read-only requests by the database they were sent to')
+Metrics.describe('db_replica_lag_seconds', 'Replica lag behind the primary, -1 when unreachable')
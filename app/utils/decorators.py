@@ -1,9 +1,23 @@
 from functools import wraps
-from flask import jsonify
+from flask import g, jsonify
 from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity, get_jwt
+from app import db
 from app.models.user import User
 
 
+def get_current_user():
+    """Load the authenticated User at most once per request
+    
+    Call after the JWT has been verified. Role, approval and seller status
+    are in the token claims (see User.token_claims), so only handlers that
+    need other columns should call this. Returns None if the user no longer
+    exists.
+    """
+    if '_current_user' not in g:
+        g._current_user = db.session.get(User, int(get_jwt_identity()))
+    return g._current_user
+
+
 def token_required(f):
     """Decorator to require JWT token"""
     @wraps(f)
@@ -1,20 +1,71 @@
-import redis
-from flask import current_app
+import hashlib
+import logging
+import math
+import threading
+import time
+from flask import current_app, has_app_context
 from datetime import timedelta
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from app import socketio
+from app.models.seller import Seller
+from app.models.user import User
+from app.utils.metrics import Metrics
+from app.utils.outbox import OutboxService
+from app.utils.redis_client import RedisClient
+
+
+logger = logging.getLogger(__name__)
+
+
+class BloomFilter:
+    """Fixed-size bloom filter of strings"""
+    
+    def __init__(self, capacity, error_rate):
+        self.size = max(64, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+    
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+    
+    def add(self, key):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+    
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
 
 
 class JWTBlacklist:
-    """JWT token blacklist using Redis"""
+    """JWT token blacklist using Redis
+    
+    Revoked JTIs live in Redis (``blacklist:{jti}``), next to the time each
+    user's claims last changed (``blacklist:user:{id}``). Each process also
+    keeps a bloom filter of both, loaded with SCAN and kept current through
+    the ``jwt_revocations`` pub/sub channel, so most checks are answered
+    locally: a JTI or user the filter has never seen cannot be revoked, and
+    Redis is only asked on a filter hit. The filter is rebuilt every
+    JWT_REVOCATION_REBUILD_SECONDS to shed expired entries. Until it is
+    loaded, or while the subscription is down, every check goes to Redis.
+    When Redis cannot be reached, JWT_REVOCATION_FAIL_OPEN decides whether
+    the token is accepted (default) or rejected.
+    """
     
-    _redis_client = None
+    CHANNEL = 'jwt_revocations'
+    KEY_PREFIX = 'blacklist:'
+    
+    _bloom = None
+    _sync_task = None
+    _lock = threading.Lock()
     
     @classmethod
     def get_redis_client(cls):
-        """Get or create Redis client"""
-        if cls._redis_client is None:
-            redis_url = current_app.config.get('REDIS_URL', 'redis://localhost:6379/0')
-            cls._redis_client = redis.from_url(redis_url, decode_responses=True)
-        return cls._redis_client
+        """Get the shared Redis client"""
+        return RedisClient.get_client()
     
     @classmethod
     def add_token_to_blacklist(cls, jti, expires_in):
@@ -22,21 +73,188 @@ class JWTBlacklist:
         try:
             redis_client = cls.get_redis_client()
             redis_client.setex(
-                f"blacklist:{jti}",
+                f"{cls.KEY_PREFIX}{jti}",
                 expires_in,
                 "true"
             )
+            redis_client.publish(cls.CHANNEL, jti)
+            if cls._bloom is not None:
+                cls._bloom.add(jti)
             return True
         except Exception as e:
             current_app.logger.error(f"Error adding token to blacklist: {str(e)}")
             return False
     
+    @classmethod
+    def revoke_claims(cls, user_id, changed_at):
+        """Reject access tokens issued to a user before ``changed_at``
+        
+        Used when a user's role, approval or seller status changes, so that
+        tokens carrying the old claims stop working and the client refreshes.
+        Kept for as long as an access token lives. Token ``iat`` is in whole
+        seconds, so the time is rounded up: a token issued earlier in the
+        same second as the change is rejected too.
+        """
+        member = f"user:{user_id}"
+        expires = current_app.config.get('JWT_ACCESS_TOKEN_EXPIRES', timedelta(hours=1))
+        try:
+            redis_client = cls.get_redis_client()
+            redis_client.setex(
+                f"{cls.KEY_PREFIX}{member}",
+                int(expires.total_seconds()),
+                math.ceil(changed_at)
+            )
+            redis_client.publish(cls.CHANNEL, member)
+            if cls._bloom is not None:
+                cls._bloom.add(member)
+            return True
+        except Exception as e:
+            current_app.logger.error(f"Error revoking token claims: {str(e)}")
+            return False
+    
+    @classmethod
+    def is_token_revoked(cls, jwt_payload):
+        """Check a decoded token against revoked JTIs and changed claims"""
+        if cls.is_token_blacklisted(jwt_payload['jti']):
+            return True
+        if jwt_payload.get('type') != 'access':
+            return False
+        return cls._check(
+            f"user:{jwt_payload['sub']}",
+            lambda redis_client, key: jwt_payload['iat'] < int(redis_client.get(key) or 0)
+        )
+    
     @classmethod
     def is_token_blacklisted(cls, jti):
         """Check if token JTI is blacklisted"""
+        return cls._check(jti, lambda redis_client, key: redis_client.exists(key) > 0)
+    
+    @classmethod
+    def _check(cls, member, lookup):
+        cls._ensure_sync()
+        
+        bloom = cls._bloom
+        if bloom is not None and member not in bloom:
+            Metrics.inc('jwt_revocation_checks_total', result='local')
+            return False
+        
+        started = time.perf_counter()
         try:
-            redis_client = cls.get_redis_client()
-            return redis_client.exists(f"blacklist:{jti}") > 0
+            revoked = lookup(cls.get_redis_client(), f"{cls.KEY_PREFIX}{member}")
         except Exception as e:
             current_app.logger.error(f"Error checking token blacklist: {str(e)}")
-            return False
+            Metrics.inc('jwt_revocation_checks_total', result='error')
+            return not current_app.config.get('JWT_REVOCATION_FAIL_OPEN', True)
+        finally:
+            Metrics.inc('jwt_revocation_redis_seconds_total', time.perf_counter() - started)
+        
+        if revoked:
+            result = 'revoked'
+        else:
+            result = 'false_positive' if bloom is not None else 'unsynced'
+        Metrics.inc('jwt_revocation_checks_total', result=result)
+        return revoked
+    
+    @classmethod
+    def _ensure_sync(cls):
+        if cls._sync_task is not None or not current_app.config.get('JWT_REVOCATION_LOCAL_CACHE', True):
+            return
+        with cls._lock:
+            if cls._sync_task is None:
+                cls._sync_task = socketio.start_background_task(cls._sync, current_app._get_current_object())
+    
+    @classmethod
+    def _load(cls, client, capacity, error_rate):
+        bloom = BloomFilter(capacity, error_rate)
+        loaded = 0
+        for key in client.scan_iter(match=f'{cls.KEY_PREFIX}*', count=1000):
+            bloom.add(key[len(cls.KEY_PREFIX):])
+            loaded += 1
+        if loaded > capacity:
+            logger.warning(f"{loaded} revoked tokens exceed JWT_REVOCATION_BLOOM_CAPACITY ({capacity})")
+        Metrics.set_gauge('jwt_revocation_bloom_entries', loaded)
+        return bloom
+    
+    @classmethod
+    def _sync(cls, app):
+        capacity = app.config.get('JWT_REVOCATION_BLOOM_CAPACITY', 100000)
+        error_rate = app.config.get('JWT_REVOCATION_BLOOM_ERROR_RATE', 0.001)
+        rebuild_interval = app.config.get('JWT_REVOCATION_REBUILD_SECONDS', 3600)
+        
+        while True:
+            pubsub = None
+            try:
+                with app.app_context():
+                    client = cls.get_redis_client()
+                
+                # Subscribe before loading: revocations published during the
+                # SCAN wait in the subscription and are applied afterwards
+                pubsub = client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(cls.CHANNEL)
+                cls._bloom = cls._load(client, capacity, error_rate)
+                rebuild_at = time.monotonic() + rebuild_interval
+                
+                while True:
+                    message = pubsub.get_message(timeout=1.0)
+                    if message is not None:
+                        cls._bloom.add(message['data'])
+                    if time.monotonic() >= rebuild_at:
+                        cls._bloom = cls._load(client, capacity, error_rate)
+                        rebuild_at = time.monotonic() + rebuild_interval
+            except Exception as e:
+                logger.error(f"JWT revocation sync error: {str(e)}")
+                cls._bloom = None
+                if pubsub is not None:
+                    try:
+                        pubsub.close()
+                    except Exception:
+                        pass
+                socketio.sleep(5)
+
+
+Metrics.describe('jwt_revocation_checks_total', 'Token revocation checks by how they were answered')
+Metrics.describe('jwt_revocation_redis_seconds_total', 'Time spent on Redis revocation lookups')
+Metrics.describe('jwt_revocation_bloom_entries', 'Revoked JTIs loaded into the local bloom filter')
+
+
+@event.listens_for(Session, 'before_flush')
+def _queue_claims_revocation(session, flush_context, instances):
+    """Revoke access tokens whose role, approval or seller status claims changed
+    
+    The revocation is queued in the same transaction, whichever code path
+    made the change, and applied once it has committed: right away by
+    ``_apply_claims_revocation`` and again by the outbox, which retries
+    until Redis has it. Both take the time after commit, so a token
+    refreshed before the commit, still with the old claims, is rejected.
+    """
+    user_ids = set()
+    for obj in session.dirty:
+        if isinstance(obj, User):
+            attrs = inspect(obj).attrs
+            if attrs.role.history.has_changes() or attrs.approved.history.has_changes():
+                user_ids.add(obj.id)
+        elif isinstance(obj, Seller) and inspect(obj).attrs.approval_status.history.has_changes():
+            user_ids.add(obj.user_id)
+    for obj in session.new:
+        if isinstance(obj, Seller):
+            user_ids.add(obj.user_id)
+    
+    queued = session.info.setdefault('claims_revoked', set())
+    for user_id in user_ids - queued:
+        OutboxService.enqueue('user_claims_changed', {'user_id': user_id})
+    queued.update(user_ids)
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_claims_revocation(session):
+    user_ids = session.info.pop('claims_revoked', None)
+    if not user_ids or not has_app_context():
+        return
+    changed_at = time.time()
+    for user_id in user_ids:
+        JWTBlacklist.revoke_claims(user_id, changed_at)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _clear_claims_revoked(session):
+    session.info.pop('claims_revoked', None)
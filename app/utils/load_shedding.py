@@ -0,0 +1,82 @@
+"""Adaptive concurrency limit with priority-based load shedding"""
+
+import threading
+from flask import current_app, g, request
+from app.utils.metrics import Metrics
+from app.utils.validators import error_response
+
+
+class LoadShedder:
+    """Cap the requests in flight in this process and shed the cheap ones first
+    
+    The limit starts at LOAD_SHED_MAX_CONCURRENCY. After each request it is
+    cut by 10% when the request waited more than LOAD_SHED_POOL_WAIT_TARGET
+    seconds for database connections, halved when a checkout timed out, and
+    otherwise grows by about one per ``limit`` requests, never below
+    LOAD_SHED_MIN_CONCURRENCY.
+    
+    Each endpoint has a priority from LOAD_SHED_PRIORITIES (``normal`` if
+    unlisted) that may only use a share of the limit, so as the pool
+    saturates listings and search get a fast 503 with Retry-After well
+    before bid placement does.
+    """
+    
+    SHARES = {'low': 0.5, 'normal': 0.8, 'critical': 1.0}
+    
+    _limit = None
+    _inflight = 0
+    _lock = threading.Lock()
+    
+    @staticmethod
+    def priority():
+        return current_app.config.get('LOAD_SHED_PRIORITIES', {}).get(request.endpoint, 'normal')
+    
+    @classmethod
+    def before_request(cls):
+        """Admit the request or answer 503"""
+        config = current_app.config
+        if not config.get('LOAD_SHED_ENABLED', True) or request.endpoint is None:
+            return None
+        
+        priority = cls.priority()
+        with cls._lock:
+            if cls._limit is None:
+                cls._limit = float(config.get('LOAD_SHED_MAX_CONCURRENCY', 64))
+            admitted = cls._inflight < cls._limit * cls.SHARES[priority]
+            if admitted:
+                cls._inflight += 1
+        if admitted:
+            g.load_shed_admitted = True
+            return None
+        
+        Metrics.inc('load_shed_rejections_total', priority=priority)
+        response, status = error_response('Server is busy, please retry shortly', 503)
+        response.headers['Retry-After'] = str(config.get('LOAD_SHED_RETRY_AFTER', 2))
+        return response, status
+    
+    @classmethod
+    def teardown_request(cls, exc=None):
+        """Release the slot and adjust the limit from the request's pool wait"""
+        if not g.pop('load_shed_admitted', False):
+            return
+        config = current_app.config
+        minimum = config.get('LOAD_SHED_MIN_CONCURRENCY', 4)
+        maximum = config.get('LOAD_SHED_MAX_CONCURRENCY', 64)
+        
+        with cls._lock:
+            cls._inflight -= 1
+            if g.get('db_pool_timed_out'):
+                cls._limit = max(minimum, cls._limit * 0.5)
+            elif g.get('db_pool_wait', 0.0) > config.get('LOAD_SHED_POOL_WAIT_TARGET', 0.05):
+                cls._limit = max(minimum, cls._limit * 0.9)
+            else:
+                cls._limit = min(maximum, cls._limit + 1 / cls._limit)
+    
+    @classmethod
+    def _concurrency(cls):
+        return {(('kind', 'limit'),): cls._limit or 0, (('kind', 'inflight'),): cls._inflight}
+
+
+Metrics.register_gauge('load_shed_concurrency', LoadShedder._concurrency,
+                       'Adaptive request concurrency limit and requests in flight')
+Metrics.describe('load_shed_rejections_total', 'Requests answered 503 by the load shedder, by priority')
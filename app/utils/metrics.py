@@ -0,0 +1,139 @@
+"""In-process metrics registry with Prometheus text exposition"""
+
+import threading
+
+
+class Metrics:
+    """Process-local counters, gauges and histograms
+    
+    Counters and gauges are keyed by name plus a sorted tuple of label pairs.
+    Gauges can also be registered as callbacks that are evaluated at scrape
+    time. Histograms use the buckets given to ``histogram``, or
+    DEFAULT_BUCKETS. ``render`` returns the Prometheus text format served by
+    ``GET /api/metrics``.
+    """
+    
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+    
+    _lock = threading.Lock()
+    _counters = {}
+    _gauges = {}
+    _gauge_callbacks = {}
+    _histograms = {}
+    _buckets = {}
+    _help = {}
+    
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted(labels.items()))
+    
+    @classmethod
+    def describe(cls, name, help_text):
+        """Attach a HELP line to a metric"""
+        cls._help[name] = help_text
+    
+    @classmethod
+    def inc(cls, name, value=1, **labels):
+        """Increment a counter"""
+        key = cls._key(name, labels)
+        with cls._lock:
+            cls._counters[key] = cls._counters.get(key, 0) + value
+    
+    @classmethod
+    def set_gauge(cls, name, value, **labels):
+        """Set a gauge to an absolute value"""
+        with cls._lock:
+            cls._gauges[cls._key(name, labels)] = value
+    
+    @classmethod
+    def register_gauge(cls, name, callback, help_text=None):
+        """Register a gauge computed at scrape time
+        
+        ``callback`` returns either a number or a dict mapping label dicts
+        (as tuples of pairs) to numbers.
+        """
+        cls._gauge_callbacks[name] = callback
+        if help_text:
+            cls.describe(name, help_text)
+    
+    @classmethod
+    def histogram(cls, name, buckets, help_text=None):
+        """Declare the bucket upper bounds of a histogram"""
+        cls._buckets[name] = tuple(sorted(buckets))
+        if help_text:
+            cls.describe(name, help_text)
+    
+    @classmethod
+    def observe(cls, name, value, **labels):
+        """Record one observation in a histogram"""
+        buckets = cls._buckets.get(name, cls.DEFAULT_BUCKETS)
+        key = cls._key(name, labels)
+        with cls._lock:
+            sample = cls._histograms.setdefault(key, {'buckets': [0] * len(buckets), 'sum': 0, 'count': 0})
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    sample['buckets'][i] += 1
+            sample['sum'] += value
+            sample['count'] += 1
+    
+    @classmethod
+    def get(cls, name, **labels):
+        """Read the current value of a counter or gauge"""
+        key = cls._key(name, labels)
+        with cls._lock:
+            return cls._counters.get(key, cls._gauges.get(key, 0))
+    
+    @staticmethod
+    def _format_labels(labels):
+        if not labels:
+            return ''
+        pairs = ','.join(f'{k}="{v}"' for k, v in labels)
+        return '{' + pairs + '}'
+    
+    @classmethod
+    def render(cls):
+        """Render every metric in Prometheus text exposition format"""
+        lines = []
+        
+        with cls._lock:
+            counters = dict(cls._counters)
+            gauges = dict(cls._gauges)
+            histograms = {key: dict(sample, buckets=list(sample['buckets']))
+                          for key, sample in cls._histograms.items()}
+        
+        for name, callback in cls._gauge_callbacks.items():
+            try:
+                value = callback()
+            except Exception:
+                continue
+            if isinstance(value, dict):
+                for labels, sample in value.items():
+                    gauges[(name, tuple(labels))] = sample
+            else:
+                gauges[(name, ())] = value
+        
+        for kind, samples in (('counter', counters), ('gauge', gauges)):
+            seen = set()
+            for (name, labels), value in sorted(samples.items()):
+                if name not in seen:
+                    seen.add(name)
+                    if name in cls._help:
+                        lines.append(f'# HELP {name} {cls._help[name]}')
+                    lines.append(f'# TYPE {name} {kind}')
+                lines.append(f'{name}{cls._format_labels(labels)} {value}')
+        
+        seen = set()
+        for (name, labels), sample in sorted(histograms.items()):
+            if name not in seen:
+                seen.add(name)
+                if name in cls._help:
+                    lines.append(f'# HELP {name} {cls._help[name]}')
+                lines.append(f'# TYPE {name} histogram')
+            buckets = cls._buckets.get(name, cls.DEFAULT_BUCKETS)
+            for bound, count in zip(buckets, sample['buckets']):
+                lines.append(f'{name}_bucket{cls._format_labels(labels + (("le", bound),))} {count}')
+            lines.append(f'{name}_bucket{cls._format_labels(labels + (("le", "+Inf"),))} {sample["count"]}')
+            lines.append(f'{name}_sum{cls._format_labels(labels)} {sample["sum"]}')
+            lines.append(f'{name}_count{cls._format_labels(labels)} {sample["count"]}')
+        
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,210 @@
+"""Monthly partition maintenance and retention for the notifications table"""
+
+import logging
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import text
+from app import db
+from app.models.notification import Notification
+
+
+logger = logging.getLogger(__name__)
+
+
+def _month_start(value):
+    return datetime(value.year, value.month, 1)
+
+
+def _add_months(value, months):
+    month_index = value.year * 12 + value.month - 1 + months
+    return datetime(month_index // 12, month_index % 12 + 1, 1)
+
+
+class NotificationRetentionService:
+    """Manage monthly partitions of ``notifications``
+    
+    Partitions are named ``notifications_pYYYYMM`` and cover one calendar
+    month of ``created_at``. A default partition catches rows outside the
+    pre-created range so inserts never fail. Partitions older than
+    NOTIFICATION_RETENTION_MONTHS are detached and either dropped or moved to
+    the NOTIFICATION_ARCHIVE_SCHEMA schema. Rows past the same cutoff that
+    landed in the default partition are deleted (or moved to the archive
+    schema) NOTIFICATION_PURGE_BATCH_SIZE rows per transaction.
+    """
+    
+    TABLE = Notification.__tablename__
+    DEFAULT_PARTITION = f'{Notification.__tablename__}_default'
+    
+    @staticmethod
+    def _quote(name):
+        """Quote an identifier for use in DDL"""
+        return db.engine.dialect.identifier_preparer.quote(name)
+    
+    @classmethod
+    def partition_name(cls, month):
+        return f'{cls.TABLE}_p{month.year:04d}{month.month:02d}'
+    
+    @classmethod
+    def is_partitioned(cls):
+        """Check whether the notifications table is a partitioned table"""
+        if db.engine.dialect.name != 'postgresql':
+            return False
+        return db.session.execute(text(
+            "SELECT 1 FROM pg_partitioned_table p "
+            "JOIN pg_class c ON c.oid = p.partrelid "
+            "WHERE c.relname = :table AND pg_table_is_visible(c.oid)"
+        ), {'table': cls.TABLE}).first() is not None
+    
+    @classmethod
+    def list_partitions(cls):
+        """Return the names of the monthly partitions currently attached"""
+        rows = db.session.execute(text(
+            "SELECT child.relname FROM pg_inherits i "
+            "JOIN pg_class parent ON parent.oid = i.inhparent "
+            "JOIN pg_class child ON child.oid = i.inhrelid "
+            "WHERE parent.relname = :table AND pg_table_is_visible(parent.oid)"
+        ), {'table': cls.TABLE}).all()
+        return sorted(row.relname for row in rows if row.relname != cls.DEFAULT_PARTITION)
+    
+    @classmethod
+    def _create_partition(cls, month):
+        db.session.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {cls.partition_name(month)} "
+            f"PARTITION OF {cls.TABLE} "
+            f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{_add_months(month, 1):%Y-%m-%d}')"
+        ))
+    
+    @classmethod
+    def ensure_partitions(cls, start=None):
+        """Create partitions from ``start`` (default: this month) through the look-ahead window"""
+        if not cls.is_partitioned():
+            return 0
+        
+        created = cls._ensure_partitions(start)
+        db.session.commit()
+        return created
+    
+    @classmethod
+    def _ensure_partitions(cls, start):
+        months_ahead = current_app.config.get('NOTIFICATION_PARTITIONS_AHEAD', 2)
+        month = _month_start(start or datetime.utcnow())
+        last = _add_months(_month_start(datetime.utcnow()), months_ahead)
+        created = 0
+        
+        while month <= last:
+            cls._create_partition(month)
+            month = _add_months(month, 1)
+            created += 1
+        
+        db.session.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {cls.DEFAULT_PARTITION} PARTITION OF {cls.TABLE} DEFAULT"
+        ))
+        return created
+    
+    @classmethod
+    def apply_retention(cls):
+        """Detach partitions past the retention period and drop or archive them
+        
+        Returns:
+            List of partition names that were removed from the live table
+        """
+        if not cls.is_partitioned():
+            return []
+        
+        retention_months = current_app.config.get('NOTIFICATION_RETENTION_MONTHS', 6)
+        archive = current_app.config.get('NOTIFICATION_ARCHIVE_ENABLED', False)
+        archive_schema = current_app.config.get('NOTIFICATION_ARCHIVE_SCHEMA', 'notifications_archive')
+        cutoff = _add_months(_month_start(datetime.utcnow()), -retention_months)
+        cutoff_name = cls.partition_name(cutoff)
+        table = cls._quote(cls.TABLE)
+        schema = cls._quote(archive_schema)
+        
+        expired = [name for name in cls.list_partitions() if name < cutoff_name]
+        
+        if archive:
+            db.session.execute(text(f"CREATE SCHEMA IF NOT EXISTS {schema}"))
+        for name in expired:
+            partition = cls._quote(name)
+            db.session.execute(text(f"ALTER TABLE {table} DETACH PARTITION {partition}"))
+            if archive:
+                db.session.execute(text(f"ALTER TABLE {partition} SET SCHEMA {schema}"))
+                logger.info(f"Archived notification partition {name} to {archive_schema}")
+            else:
+                db.session.execute(text(f"DROP TABLE {partition}"))
+                logger.info(f"Dropped notification partition {name}")
+        
+        db.session.commit()
+        
+        purged = cls._purge_default(cutoff, schema if archive else None)
+        if purged:
+            logger.info(f"Purged {purged} expired notifications from {cls.DEFAULT_PARTITION}")
+        return expired
+    
+    @classmethod
+    def _purge_default(cls, cutoff, schema=None):
+        """Delete rows older than ``cutoff`` from the default partition in batches
+        
+        With ``schema`` (already quoted) the rows are moved to a table of the
+        same name there instead. Returns the number of rows removed.
+        """
+        batch_size = current_app.config.get('NOTIFICATION_PURGE_BATCH_SIZE', 1000)
+        default = cls._quote(cls.DEFAULT_PARTITION)
+        
+        batch = f"SELECT ctid FROM {default} WHERE created_at < :cutoff LIMIT :batch_size"
+        if schema is not None:
+            db.session.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {schema}.{default} (LIKE {cls._quote(cls.TABLE)})"
+            ))
+            db.session.commit()
+            statement = text(
+                f"WITH moved AS (DELETE FROM {default} WHERE ctid IN ({batch}) RETURNING *) "
+                f"INSERT INTO {schema}.{default} SELECT * FROM moved"
+            )
+        else:
+            statement = text(f"DELETE FROM {default} WHERE ctid IN ({batch})")
+        
+        purged = 0
+        while True:
+            removed = db.session.execute(statement, {'cutoff': cutoff, 'batch_size': batch_size}).rowcount
+            db.session.commit()
+            purged += removed
+            if removed < batch_size:
+                return purged
+    
+    @classmethod
+    def convert_existing_table(cls):
+        """Rebuild a plain notifications table as a partitioned one, keeping its rows"""
+        if db.engine.dialect.name != 'postgresql':
+            raise RuntimeError('Notification partitioning requires PostgreSQL')
+        if cls.is_partitioned():
+            return 0
+        
+        legacy = f'{cls.TABLE}_legacy'
+        inspector = db.inspect(db.engine)
+        legacy_columns = {column['name'] for column in inspector.get_columns(cls.TABLE)}
+        columns = ', '.join(c.name for c in Notification.__table__.columns if c.name in legacy_columns)
+        
+        db.session.execute(text(f"ALTER TABLE {cls.TABLE} RENAME TO {legacy}"))
+        
+        # Free up index and sequence names for the new table
+        index_names = db.session.execute(text(
+            "SELECT indexname FROM pg_indexes WHERE tablename = :table"
+        ), {'table': legacy}).scalars().all()
+        for index_name in index_names:
+            db.session.execute(text(f"ALTER INDEX {index_name} RENAME TO {index_name}_legacy"))
+        db.session.execute(text(f"ALTER SEQUENCE IF EXISTS {cls.TABLE}_id_seq RENAME TO {legacy}_id_seq"))
+        
+        Notification.__table__.create(db.session.connection())
+        
+        oldest = db.session.execute(text(f"SELECT MIN(created_at) FROM {legacy}")).scalar()
+        cls._ensure_partitions(oldest)
+        
+        moved = db.session.execute(text(
+            f"INSERT INTO {cls.TABLE} ({columns}) SELECT {columns} FROM {legacy}"
+        )).rowcount
+        db.session.execute(text(
+            f"SELECT setval('{cls.TABLE}_id_seq', COALESCE((SELECT MAX(id) FROM {cls.TABLE}), 0) + 1, false)"
+        ))
+        db.session.execute(text(f"DROP TABLE {legacy}"))
+        db.session.commit()
+        return moved
@@ -1,8 +1,20 @@
 """Notification service for managing and sending notifications"""
 
+import threading
+from flask import current_app
 from app import db, socketio
 from app.models.notification import Notification, NotificationPreference
-from datetime import datetime
+from app.utils.metrics import Metrics
+from app.utils.preference_cache import NotificationPreferenceCache, PREFERENCE_FIELDS
+from app.utils.presence import UserPresence
+from datetime import datetime, timedelta
+from sqlalchemy.dialects.postgresql import insert
+
+# Last socket push per digest row, used to throttle digest emits
+_digest_last_emit = {}
+# Digest rows with a trailing push scheduled
+_digest_pending = set()
+_digest_lock = threading.Lock()
 
 
 class NotificationService:
@@ -39,9 +51,157 @@ class NotificationService:
         
         return notification
     
+    @staticmethod
+    def emit_to_user(notification):
+        """Push a notification to the user's sockets, skipped if they have none"""
+        if not UserPresence.is_online(notification.user_id):
+            Metrics.inc('notification_emits_skipped_total')
+            return
+        socketio.emit('notification', notification.to_dict(), room=f'user_{notification.user_id}')
+    
+    @staticmethod
+    def create_and_emit_bulk(rows):
+        """
+        Create many notifications in one batch and emit each to its user room
+        
+        Args:
+            rows: List of dicts with create_notification keyword arguments
+        
+        Returns:
+            List of Notification objects
+        """
+        if not rows:
+            return []
+        
+        # Resolve preferences for every recipient in one lookup
+        preferences = NotificationPreferenceCache.get_many(row['user_id'] for row in rows)
+        rows = [
+            row for row in rows
+            if PREFERENCE_FIELDS.get(row['notification_type']) is None
+            or preferences[int(row['user_id'])][PREFERENCE_FIELDS[row['notification_type']]]
+        ]
+        if not rows:
+            return []
+        
+        notifications = [
+            Notification(
+                user_id=row['user_id'],
+                type=row['notification_type'],
+                title=row['title'],
+                message=row['message'],
+                related_auction_id=row.get('related_auction_id'),
+                related_image_id=row.get('related_image_id')
+            )
+            for row in rows
+        ]
+        
+        db.session.add_all(notifications)
+        db.session.commit()
+        
+        online = UserPresence.online_users(notification.user_id for notification in notifications)
+        for notification in notifications:
+            if notification.user_id in online:
+                socketio.emit('notification', notification.to_dict(), room=f'user_{notification.user_id}')
+            else:
+                Metrics.inc('notification_emits_skipped_total')
+        
+        return notifications
+    
+    @staticmethod
+    def upsert_digest(user_id, notification_type, title, message, digest_suffix, related_auction_id):
+        """
+        Fold a notification into the user's digest row for the current window
+        
+        Rows are upserted on (user, auction, type, window). The first event in
+        a window inserts the row with ``message``; later ones bump
+        ``digest_count`` and rewrite the message as "<count><digest_suffix>".
+        Socket pushes for a digest row are throttled to one per
+        NOTIFICATION_DIGEST_EMIT_INTERVAL seconds; an update that falls inside
+        the interval schedules one trailing push at its end, so the last
+        count and price of a burst always reach the user.
+        
+        Returns:
+            Notification object
+        """
+        window = current_app.config.get('NOTIFICATION_DIGEST_WINDOW_SECONDS', 300)
+        now = datetime.utcnow()
+        epoch = datetime(1970, 1, 1)
+        window_start = epoch + timedelta(seconds=int((now - epoch).total_seconds()) // window * window)
+        
+        stmt = insert(Notification).values(
+            user_id=user_id,
+            type=notification_type,
+            title=title,
+            message=message,
+            related_auction_id=related_auction_id,
+            is_read=False,
+            digest_window=window_start,
+            digest_count=1,
+            created_at=window_start,
+            updated_at=now
+        ).on_conflict_do_update(
+            index_elements=['user_id', 'related_auction_id', 'type', 'digest_window', 'created_at'],
+            set_={
+                'digest_count': Notification.digest_count + 1,
+                'message': db.cast(Notification.digest_count + 1, db.String) + digest_suffix,
+                'is_read': False,
+                'updated_at': now
+            }
+        ).returning(Notification)
+        
+        notification = db.session.scalars(
+            stmt, execution_options={'populate_existing': True}
+        ).one()
+        db.session.commit()
+        
+        interval = current_app.config.get('NOTIFICATION_DIGEST_EMIT_INTERVAL', 5)
+        key = (notification.id, notification.created_at)
+        delay = None
+        with _digest_lock:
+            last_emit = _digest_last_emit.get(key)
+            should_emit = last_emit is None or (now - last_emit).total_seconds() >= interval
+            if should_emit:
+                _digest_last_emit[key] = now
+            elif key not in _digest_pending:
+                _digest_pending.add(key)
+                delay = interval - (now - last_emit).total_seconds()
+            if len(_digest_last_emit) > 10000:
+                cutoff = now - timedelta(seconds=window)
+                for old in [k for k, ts in _digest_last_emit.items() if ts < cutoff and k not in _digest_pending]:
+                    del _digest_last_emit[old]
+        
+        if should_emit:
+            NotificationService.emit_to_user(notification)
+        elif delay is not None:
+            socketio.start_background_task(
+                NotificationService._emit_digest_later, current_app._get_current_object(), key, delay
+            )
+        
+        return notification
+    
+    @staticmethod
+    def _emit_digest_later(app, key, delay):
+        """Push the current state of a digest row once its throttle interval is over"""
+        socketio.sleep(delay)
+        with _digest_lock:
+            _digest_pending.discard(key)
+            _digest_last_emit[key] = datetime.utcnow()
+        with app.app_context():
+            try:
+                notification = db.session.get(Notification, key)
+                if notification is not None:
+                    NotificationService.emit_to_user(notification)
+            except Exception as e:
+                current_app.logger.error(f"Error pushing notification digest: {str(e)}")
+            finally:
+                db.session.remove()
+    
     @staticmethod
     def notify_image_uploaded(user_id, auction_id, image_id, image_title):
         """Notify when an image is uploaded"""
+        if not NotificationPreferenceCache.is_enabled(user_id, 'image_uploaded'):
+            return None
+        
         title = "New Image Uploaded"
         message = f"Image '{image_title}' was uploaded to your auction"
         
@@ -55,16 +215,29 @@ class NotificationService:
         )
         
         # Emit real-time notification
-        socketio.emit('notification', notification.to_dict(), room=f'user_{user_id}')
+        NotificationService.emit_to_user(notification)
         
         return notification
     
     @staticmethod
     def notify_bid_placed(seller_id, auction_id, bidder_username, bid_amount):
         """Notify seller when a bid is placed"""
+        if not NotificationPreferenceCache.is_enabled(seller_id, 'bid_placed'):
+            return None
+        
         title = "New Bid Received"
         message = f"{bidder_username} placed a bid of ${bid_amount:,.2f}"
         
+        if current_app.config.get('NOTIFICATION_DIGEST_ENABLED', True):
+            return NotificationService.upsert_digest(
+                user_id=seller_id,
+                notification_type='bid_placed',
+                title=title,
+                message=message,
+                digest_suffix=f" new bids, now ${bid_amount:,.2f}",
+                related_auction_id=auction_id
+            )
+        
         notification = NotificationService.create_notification(
             user_id=seller_id,
             notification_type='bid_placed',
@@ -73,13 +246,16 @@ class NotificationService:
             related_auction_id=auction_id
         )
         
-        socketio.emit('notification', notification.to_dict(), room=f'user_{seller_id}')
+        NotificationService.emit_to_user(notification)
         
         return notification
     
     @staticmethod
     def notify_outbid(user_id, auction_id, auction_title, current_price):
         """Notify user they've been outbid"""
+        if not NotificationPreferenceCache.is_enabled(user_id, 'outbid'):
+            return None
+        
         title = "You've Been Outbid"
         message = f"Someone placed a higher bid on {auction_title}. Current price: ${current_price:,.2f}"
         
@@ -91,13 +267,16 @@ class NotificationService:
             related_auction_id=auction_id
         )
         
-        socketio.emit('notification', notification.to_dict(), room=f'user_{user_id}')
+        NotificationService.emit_to_user(notification)
         
         return notification
     
     @staticmethod
     def notify_auction_ending(user_id, auction_id, auction_title, time_remaining):
         """Notify when an auction is ending soon"""
+        if not NotificationPreferenceCache.is_enabled(user_id, 'auction_ending'):
+            return None
+        
         title = "Auction Ending Soon"
         message = f"{auction_title} is ending in {time_remaining}"
         
@@ -109,13 +288,16 @@ class NotificationService:
             related_auction_id=auction_id
         )
         
-        socketio.emit('notification', notification.to_dict(), room=f'user_{user_id}')
+        NotificationService.emit_to_user(notification)
         
         return notification
     
     @staticmethod
     def notify_auction_won(user_id, auction_id, auction_title, final_price):
         """Notify user they won an auction"""
+        if not NotificationPreferenceCache.is_enabled(user_id, 'auction_won'):
+            return None
+        
         title = "Congratulations! You Won!"
         message = f"You won the auction for {auction_title} with a final bid of ${final_price:,.2f}"
         
@@ -127,13 +309,16 @@ class NotificationService:
             related_auction_id=auction_id
         )
         
-        socketio.emit('notification', notification.to_dict(), room=f'user_{user_id}')
+        NotificationService.emit_to_user(notification)
         
         return notification
     
     @staticmethod
     def notify_auction_ended_no_winner(seller_id, auction_id, auction_title):
         """Notify seller when auction ends with no bids"""
+        if not NotificationPreferenceCache.is_enabled(seller_id, 'auction_no_bids'):
+            return None
+        
         title = "Auction Ended - No Bids"
         message = f"Your auction for {auction_title} ended without any bids"
         
@@ -145,14 +330,14 @@ class NotificationService:
             related_auction_id=auction_id
         )
         
-        socketio.emit('notification', notification.to_dict(), room=f'user_{seller_id}')
+        NotificationService.emit_to_user(notification)
         
         return notification
     
     @staticmethod
     def mark_as_read(notification_id):
         """Mark notification as read"""
-        notification = Notification.query.get(notification_id)
+        notification = Notification.query.filter_by(id=notification_id).first()
         if notification:
             notification.is_read = True
             notification.updated_at = datetime.utcnow()
@@ -172,7 +357,7 @@ class NotificationService:
     @staticmethod
     def delete_notification(notification_id):
         """Delete a notification"""
-        notification = Notification.query.get(notification_id)
+        notification = Notification.query.filter_by(id=notification_id).first()
         if notification:
             db.session.delete(notification)
             db.session.commit()
@@ -205,3 +390,6 @@ class NotificationService:
             db.session.commit()
         
         return preference
+
+
+Metrics.describe('notification_emits_skipped_total', 'Notification pushes skipped because the user had no live socket')
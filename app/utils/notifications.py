@@ -5,6 +5,7 @@ from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from flask import current_app
 from datetime import datetime
+from app.utils.db_pool import PoolMonitor
 
 
 class ImageNotificationService:
@@ -46,7 +47,8 @@ class ImageNotificationService:
             msg.attach(MIMEText(html_body, 'html'))
             
             # Send email
-            with smtplib.SMTP(smtp_config['server'], smtp_config['port']) as server:
+            with PoolMonitor.external_call('smtp'), \
+                    smtplib.SMTP(smtp_config['server'], smtp_config['port']) as server:
                 server.starttls()
                 server.login(smtp_config['username'], smtp_config['password'])
                 server.sendmail(
@@ -0,0 +1,264 @@
+"""Transactional outbox for post-commit side effects"""
+
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import event, func, update
+from sqlalchemy.orm import Session
+from app import db, socketio
+from app.models.outbox import OutboxEvent
+from app.utils.metrics import Metrics
+
+
+logger = logging.getLogger(__name__)
+
+
+class OutboxService:
+    """Record side effects in the caller's transaction and deliver them later
+    
+    ``enqueue`` only adds an OutboxEvent to the current session; the event is
+    committed (or rolled back) together with the business change. The
+    dispatcher claims pending events in batches with
+    ``SELECT ... FOR UPDATE SKIP LOCKED``, leases them for
+    OUTBOX_LEASE_SECONDS and runs the registered handler. Delivery is
+    at-least-once: a worker that dies mid-batch leaves its events to be
+    picked up again when the lease expires, so handlers must tolerate
+    duplicates.
+    """
+    
+    _handlers = {}
+    _wakeup = threading.Event()
+    _thread = None
+    
+    @classmethod
+    def handler(cls, event_type):
+        """Decorator registering the delivery function for an event type"""
+        def decorator(f):
+            cls._handlers[event_type] = f
+            return f
+        return decorator
+    
+    @classmethod
+    def enqueue(cls, event_type, payload):
+        """Add an event to the current transaction"""
+        outbox_event = OutboxEvent(event_type=event_type, payload=payload)
+        db.session.add(outbox_event)
+        db.session.info['outbox_pending'] = True
+        return outbox_event
+    
+    @classmethod
+    def emit(cls, event_name, data, room=None):
+        """Queue a Socket.IO emit"""
+        return cls.enqueue('socket_emit', {'event': event_name, 'data': data, 'room': room})
+    
+    @classmethod
+    def notify(cls, method, **kwargs):
+        """Queue a NotificationService.<method>(**kwargs) call"""
+        return cls.enqueue('notification', {'method': method, 'kwargs': kwargs})
+    
+    @classmethod
+    def claim_batch(cls):
+        """Lease the next batch of due events and return them as plain rows"""
+        batch_size = current_app.config.get('OUTBOX_BATCH_SIZE', 100)
+        lease = current_app.config.get('OUTBOX_LEASE_SECONDS', 30)
+        now = datetime.utcnow()
+        
+        due = db.session.query(OutboxEvent.id).filter(
+            OutboxEvent.status == 'pending',
+            OutboxEvent.available_at <= now
+        ).order_by(OutboxEvent.id).limit(batch_size).with_for_update(skip_locked=True)
+        
+        rows = db.session.execute(
+            update(OutboxEvent)
+            .where(OutboxEvent.id.in_(due.scalar_subquery()))
+            .values(available_at=now + timedelta(seconds=lease), attempts=OutboxEvent.attempts + 1)
+            .returning(OutboxEvent.id, OutboxEvent.event_type, OutboxEvent.payload,
+                       OutboxEvent.attempts, OutboxEvent.created_at)
+            .execution_options(synchronize_session=False)
+        ).all()
+        db.session.commit()
+        
+        return sorted(rows, key=lambda row: row.id)
+    
+    @classmethod
+    def dispatch_batch(cls):
+        """Deliver one batch of events
+        
+        Returns:
+            Number of events claimed
+        """
+        rows = cls.claim_batch()
+        max_attempts = current_app.config.get('OUTBOX_MAX_ATTEMPTS', 10)
+        done, failed = [], []
+        
+        for row in rows:
+            try:
+                handler = cls._handlers[row.event_type]
+                handler(row.payload)
+                done.append(row.id)
+                Metrics.inc('outbox_events_delivered_total', event_type=row.event_type)
+                Metrics.set_gauge('outbox_delivery_lag_seconds',
+                                  (datetime.utcnow() - row.created_at).total_seconds(),
+                                  event_type=row.event_type)
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Outbox event {row.id} ({row.event_type}) failed: {str(e)}")
+                failed.append((row, str(e)))
+                Metrics.inc('outbox_events_failed_total', event_type=row.event_type)
+        
+        now = datetime.utcnow()
+        if done:
+            db.session.execute(
+                update(OutboxEvent)
+                .where(OutboxEvent.id.in_(done))
+                .values(status='done', processed_at=now, last_error=None)
+                .execution_options(synchronize_session=False)
+            )
+        for row, error in failed:
+            dead = row.attempts >= max_attempts
+            backoff = min(2 ** row.attempts, 300)
+            db.session.execute(
+                update(OutboxEvent)
+                .where(OutboxEvent.id == row.id)
+                .values(
+                    status='dead' if dead else 'pending',
+                    last_error=error[:2000],
+                    available_at=now + timedelta(seconds=backoff),
+                    processed_at=now if dead else None
+                )
+                .execution_options(synchronize_session=False)
+            )
+        db.session.commit()
+        
+        return len(rows)
+    
+    @classmethod
+    def purge_delivered(cls):
+        """Delete delivered events older than OUTBOX_RETENTION_HOURS"""
+        hours = current_app.config.get('OUTBOX_RETENTION_HOURS', 24)
+        deleted = OutboxEvent.query.filter(
+            OutboxEvent.status == 'done',
+            OutboxEvent.processed_at < datetime.utcnow() - timedelta(hours=hours)
+        ).delete(synchronize_session=False)
+        db.session.commit()
+        return deleted
+    
+    @classmethod
+    def queue_stats(cls):
+        """Return pending depth and age of the oldest pending event in seconds"""
+        depth, oldest = db.session.query(
+            func.count(OutboxEvent.id), func.min(OutboxEvent.created_at)
+        ).filter(OutboxEvent.status == 'pending').one()
+        lag = (datetime.utcnow() - oldest).total_seconds() if oldest else 0
+        return depth, lag
+    
+    @classmethod
+    def wake(cls):
+        """Wake the dispatcher after a commit that produced events"""
+        cls._wakeup.set()
+    
+    @classmethod
+    def start_dispatcher(cls, app):
+        """Start the background dispatcher thread for this process"""
+        if cls._thread is not None:
+            return cls._thread
+        
+        def run():
+            poll_interval = app.config.get('OUTBOX_POLL_INTERVAL', 1.0)
+            stats_interval = app.config.get('OUTBOX_STATS_INTERVAL', 10)
+            next_stats = 0
+            while True:
+                claimed = 0
+                with app.app_context():
+                    try:
+                        claimed = cls.dispatch_batch()
+                        if time.monotonic() >= next_stats:
+                            depth, lag = cls.queue_stats()
+                            Metrics.set_gauge('outbox_queue_depth', depth)
+                            Metrics.set_gauge('outbox_oldest_pending_seconds', lag)
+                            next_stats = time.monotonic() + stats_interval
+                    except Exception as e:
+                        logger.error(f"Outbox dispatcher error: {str(e)}")
+                        db.session.rollback()
+                    finally:
+                        db.session.remove()
+                # Drain back-to-back while there is work, otherwise sleep until woken
+                if not claimed:
+                    cls._wakeup.wait(poll_interval)
+                    cls._wakeup.clear()
+        
+        # A real thread in threading mode, a green thread under eventlet/gevent
+        cls._thread = socketio.start_background_task(run)
+        app.logger.info("Outbox dispatcher started")
+        return cls._thread
+
+
+@event.listens_for(Session, 'after_commit')
+def _wake_dispatcher(session):
+    if session.info.pop('outbox_pending', False):
+        OutboxService.wake()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _clear_pending(session):
+    session.info.pop('outbox_pending', None)
+
+
+Metrics.describe('outbox_events_delivered_total', 'Outbox events delivered by this process')
+Metrics.describe('outbox_events_failed_total', 'Outbox delivery attempts that raised')
+Metrics.describe('outbox_queue_depth', 'Pending outbox events')
+Metrics.describe('outbox_oldest_pending_seconds', 'Age of the oldest pending outbox event')
+Metrics.describe('outbox_delivery_lag_seconds', 'Commit-to-delivery lag of the last delivered event')
+
+
+@OutboxService.handler('socket_emit')
+def _deliver_socket_emit(payload):
+    socketio.emit(payload['event'], payload['data'], room=payload.get('room'))
+
+
+@OutboxService.handler('notification')
+def _deliver_notification(payload):
+    from app.utils.notification_service import NotificationService
+    getattr(NotificationService, payload['method'])(**payload['kwargs'])
+
+
+@OutboxService.handler('watcher_bid')
+def _deliver_watcher_bid(payload):
+    from app.utils.watcher_fanout import WatcherFanoutService
+    WatcherFanoutService.fan_out_bid(payload['auction_id'], payload['bidder_id'], payload['bid_amount'],
+                                     payload.get('previous_bidder_id'))
+
+
+@OutboxService.handler('watcher_ending')
+def _deliver_watcher_ending(payload):
+    from app.utils.watcher_fanout import WatcherFanoutService
+    WatcherFanoutService.fan_out_ending(payload['auction_id'], payload['time_remaining'])
+
+
+@OutboxService.handler('auction_state')
+def _deliver_auction_state(payload):
+    from app.utils.auction_broadcaster import AuctionBroadcaster
+    AuctionBroadcaster.publish(payload)
+
+
+@OutboxService.handler('auction_event')
+def _deliver_auction_event(payload):
+    from app.utils.auction_broadcaster import AuctionBroadcaster
+    AuctionBroadcaster.deliver_event(payload)
+
+
+@OutboxService.handler('user_claims_changed')
+def _deliver_user_claims_changed(payload):
+    from app.utils.jwt_blacklist import JWTBlacklist
+    # Stamped on delivery, which is always after the change committed
+    if not JWTBlacklist.revoke_claims(payload['user_id'], time.time()):
+        raise RuntimeError('Could not revoke token claims')
+
+
+@OutboxService.handler('cloudinary_delete')
+def _deliver_cloudinary_delete(payload):
+    from app.utils.cloudinary_utils import delete_from_cloudinary
+    if not delete_from_cloudinary(payload['public_id']):
+        raise RuntimeError('Could not delete image from Cloudinary')
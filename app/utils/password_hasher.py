@@ -0,0 +1,136 @@
+"""Password hashing in a bounded process pool"""
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FuturesTimeout
+from flask import current_app, has_request_context
+from werkzeug.security import generate_password_hash, check_password_hash
+from app.utils.metrics import Metrics
+
+
+class PasswordHashingBusy(Exception):
+    """Raised when the hashing pool has no free slot"""
+
+
+class PasswordHasher:
+    """Run Werkzeug's password hashing outside the request thread
+    
+    scrypt and PBKDF2 are deliberately slow, so a burst of logins would
+    otherwise hold up every other request on the worker. Hashes run in a
+    ProcessPoolExecutor of PASSWORD_HASH_WORKERS forked processes that only
+    ever call the Werkzeug function (``spawn`` and ``forkserver`` would
+    re-import run.py and build a whole app in every worker). ``start`` forks
+    them all from create_app before the app has started any thread, so no
+    worker can inherit a lock held by another thread; the pool never forks
+    again. Under the eventlet and gevent async modes hashes run on the
+    hub's native thread pool instead, as forking a monkey-patched process
+    is not safe.
+    
+    At most PASSWORD_HASH_QUEUE hashes wait on top of the running ones; a
+    hash keeps its slot until it has finished, even when its caller gave
+    up. Beyond that, or when a hash takes longer than PASSWORD_HASH_TIMEOUT,
+    PasswordHashingBusy is raised so the caller can answer 503 instead of
+    queueing without bound. PASSWORD_HASH_WORKERS=0 hashes inline, as do
+    CLI commands.
+    
+    New hashes use PASSWORD_HASH_METHOD; ``needs_rehash`` tells whether a
+    stored hash was made with different parameters.
+    """
+    
+    _executor = None
+    _slots = None
+    _green = None
+    _inflight = 0
+    _prefixes = {}
+    _lock = threading.Lock()
+    
+    @classmethod
+    def start(cls, config):
+        """Create the pool and fork its workers"""
+        with cls._lock:
+            if cls._slots is not None or config.get('PASSWORD_HASH_WORKERS') == 0:
+                return
+            workers = config.get('PASSWORD_HASH_WORKERS') or os.cpu_count() or 1
+            cls._slots = threading.BoundedSemaphore(workers + config.get('PASSWORD_HASH_QUEUE', 16))
+            if config.get('SOCKETIO_ASYNC_MODE') in ('eventlet', 'gevent'):
+                cls._green = config['SOCKETIO_ASYNC_MODE']
+                return
+            cls._executor = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context('fork')
+            )
+        # The first task forks every worker
+        cls._executor.submit(int).result()
+    
+    @classmethod
+    def _release(cls, future=None):
+        with cls._lock:
+            cls._inflight -= 1
+        cls._slots.release()
+    
+    @classmethod
+    def _run(cls, fn, *args):
+        if cls._slots is None or not has_request_context():
+            return fn(*args)
+        
+        if not cls._slots.acquire(blocking=False):
+            Metrics.inc('password_hash_rejected_total')
+            raise PasswordHashingBusy()
+        with cls._lock:
+            cls._inflight += 1
+        
+        if cls._green is not None:
+            try:
+                return cls._run_native(fn, *args)
+            finally:
+                cls._release()
+        
+        try:
+            future = cls._executor.submit(fn, *args)
+        except Exception:
+            cls._release()
+            raise
+        future.add_done_callback(cls._release)
+        try:
+            return future.result(timeout=current_app.config.get('PASSWORD_HASH_TIMEOUT', 10))
+        except FuturesTimeout:
+            future.cancel()
+            Metrics.inc('password_hash_rejected_total')
+            raise PasswordHashingBusy()
+    
+    @classmethod
+    def _run_native(cls, fn, *args):
+        """Run on a real OS thread without blocking the event loop"""
+        if cls._green == 'eventlet':
+            from eventlet import tpool
+            return tpool.execute(fn, *args)
+        from gevent import get_hub
+        return get_hub().threadpool.apply(fn, args)
+    
+    @classmethod
+    def hash(cls, password):
+        """Hash a password with PASSWORD_HASH_METHOD"""
+        method = current_app.config.get('PASSWORD_HASH_METHOD', 'scrypt')
+        return cls._run(generate_password_hash, password, method)
+    
+    @classmethod
+    def verify(cls, password_hash, password):
+        """Check a password against a stored hash"""
+        return cls._run(check_password_hash, password_hash, password)
+    
+    @classmethod
+    def needs_rehash(cls, password_hash):
+        """Whether a stored hash uses other parameters than PASSWORD_HASH_METHOD"""
+        method = current_app.config.get('PASSWORD_HASH_METHOD', 'scrypt')
+        prefix = cls._prefixes.get(method)
+        if prefix is None:
+            # Werkzeug fills in default cost parameters, so hash once to see them
+            prefix = generate_password_hash('', method).split('$', 1)[0]
+            cls._prefixes[method] = prefix
+        return password_hash.split('$', 1)[0] != prefix
+
+
+Metrics.register_gauge('password_hash_inflight', lambda: PasswordHasher._inflight,
+                       'Password hashes running or waiting in the process pool')
+Metrics.describe('password_hash_rejected_total', 'Password hashes refused because the pool was full or too slow')
@@ -0,0 +1,163 @@
+"""Cached notification preference lookups"""
+
+import json
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app
+from app.models.notification import NotificationPreference
+from app.utils.redis_client import RedisClient
+
+
+# Notification type -> NotificationPreference flag that controls it
+PREFERENCE_FIELDS = {
+    'image_uploaded': 'image_uploads',
+    'bid_placed': 'bid_notifications',
+    'outbid': 'bid_notifications',
+    'watched_bid': 'bid_notifications',
+    'auction_ending': 'auction_ending',
+    'auction_won': 'auction_updates',
+    'auction_no_bids': 'auction_updates',
+}
+
+DEFAULT_PREFERENCES = {
+    'image_uploads': True,
+    'auction_updates': True,
+    'bid_notifications': True,
+    'auction_ending': True,
+    'email_notifications': False,
+}
+
+
+class NotificationPreferenceCache:
+    """Two-tier cache of user notification preferences
+    
+    Lookups go to an in-process LRU first, then Redis, then the database.
+    Bulk lookups resolve every local miss with one Redis MGET and one
+    database query. Entries are invalidated when preferences are updated;
+    the local TTL bounds staleness on other nodes.
+    """
+    
+    _local = OrderedDict()
+    _lock = threading.Lock()
+    
+    @classmethod
+    def get_redis_client(cls):
+        """Get the shared Redis client"""
+        return RedisClient.get_client()
+    
+    @staticmethod
+    def _key(user_id):
+        return f"notif_prefs:{user_id}"
+    
+    @classmethod
+    def is_enabled(cls, user_id, notification_type):
+        """Check whether a user wants notifications of the given type"""
+        field = PREFERENCE_FIELDS.get(notification_type)
+        if field is None:
+            return True
+        return cls.get(user_id)[field]
+    
+    @classmethod
+    def filter_recipients(cls, user_ids, notification_type):
+        """Return the subset of user IDs that accept the given type"""
+        field = PREFERENCE_FIELDS.get(notification_type)
+        if field is None:
+            return list(user_ids)
+        preferences = cls.get_many(user_ids)
+        return [user_id for user_id in user_ids if preferences[int(user_id)][field]]
+    
+    @classmethod
+    def get(cls, user_id):
+        """Get preference flags for a single user"""
+        return cls.get_many([user_id])[int(user_id)]
+    
+    @classmethod
+    def get_many(cls, user_ids):
+        """Get preference flags for many users, keyed by user ID"""
+        user_ids = {int(user_id) for user_id in user_ids}
+        result = {}
+        misses = []
+        
+        ttl = current_app.config.get('NOTIFICATION_PREF_LOCAL_TTL', 30)
+        max_size = current_app.config.get('NOTIFICATION_PREF_LOCAL_SIZE', 10000)
+        now = time.monotonic()
+        
+        with cls._lock:
+            for user_id in user_ids:
+                entry = cls._local.get(user_id)
+                if entry and now - entry[0] < ttl:
+                    cls._local.move_to_end(user_id)
+                    result[user_id] = entry[1]
+                else:
+                    misses.append(user_id)
+        
+        if not misses:
+            return result
+        
+        fetched = cls._get_from_redis(misses)
+        db_misses = [user_id for user_id in misses if user_id not in fetched]
+        
+        if db_misses:
+            from_db = cls._get_from_db(db_misses)
+            cls._set_in_redis(from_db)
+            fetched.update(from_db)
+        
+        with cls._lock:
+            for user_id, preferences in fetched.items():
+                cls._local[user_id] = (now, preferences)
+                cls._local.move_to_end(user_id)
+            while len(cls._local) > max_size:
+                cls._local.popitem(last=False)
+        
+        result.update(fetched)
+        return result
+    
+    @classmethod
+    def invalidate(cls, user_id):
+        """Drop cached preferences for a user after they change"""
+        with cls._lock:
+            cls._local.pop(int(user_id), None)
+        try:
+            cls.get_redis_client().delete(cls._key(user_id))
+        except Exception as e:
+            current_app.logger.error(f"Error invalidating notification preferences: {str(e)}")
+    
+    @classmethod
+    def _get_from_redis(cls, user_ids):
+        try:
+            values = cls.get_redis_client().mget([cls._key(user_id) for user_id in user_ids])
+        except Exception as e:
+            current_app.logger.error(f"Error reading notification preferences: {str(e)}")
+            return {}
+        return {
+            user_id: json.loads(value)
+            for user_id, value in zip(user_ids, values)
+            if value is not None
+        }
+    
+    @classmethod
+    def _set_in_redis(cls, preferences):
+        if not preferences:
+            return
+        ttl = current_app.config.get('NOTIFICATION_PREF_REDIS_TTL', 3600)
+        try:
+            pipe = cls.get_redis_client().pipeline(transaction=False)
+            for user_id, flags in preferences.items():
+                pipe.setex(cls._key(user_id), ttl, json.dumps(flags))
+            pipe.execute()
+        except Exception as e:
+            current_app.logger.error(f"Error caching notification preferences: {str(e)}")
+    
+    @staticmethod
+    def _get_from_db(user_ids):
+        rows = NotificationPreference.query.filter(
+            NotificationPreference.user_id.in_(user_ids)
+        ).all()
+        preferences = {user_id: dict(DEFAULT_PREFERENCES) for user_id in user_ids}
+        for row in rows:
+            preferences[row.user_id] = {
+                field: getattr(row, field) if getattr(row, field) is not None else default
+                for field, default in DEFAULT_PREFERENCES.items()
+            }
+        return preferences
@@ -0,0 +1,343 @@
+"""Auction room presence counts"""
+
+import json
+import logging
+import threading
+import time
+from flask import current_app
+from app import socketio
+from app.utils.redis_client import RedisClient
+
+
+logger = logging.getLogger(__name__)
+
+
+class AuctionPresence:
+    """Viewer counts per auction room
+    
+    Each node counts its own room members locally and publishes the count
+    into a Redis hash per auction (field = NODE_ID, value = count and
+    timestamp). A background task runs every
+    ``PRESENCE_BROADCAST_INTERVAL`` seconds: it refreshes this node's
+    fields and, for rooms whose count changed, emits one ``viewer_count``
+    to the room. A short Redis lock per room keeps that to one broadcast
+    per interval across all nodes. Fields from nodes that stopped
+    refreshing are ignored after ``PRESENCE_STALE_SECONDS``.
+    """
+    
+    _rooms = {}
+    _sid_rooms = {}
+    _dirty = set()
+    _lock = threading.Lock()
+    _task = None
+    
+    @staticmethod
+    def _key(auction_id):
+        return f"auction_viewers:{auction_id}"
+    
+    @classmethod
+    def join(cls, sid, auction_id):
+        """Count a socket as viewing an auction (idempotent per sid)"""
+        with cls._lock:
+            joined = cls._sid_rooms.setdefault(sid, set())
+            if auction_id not in joined:
+                joined.add(auction_id)
+                cls._rooms[auction_id] = cls._rooms.get(auction_id, 0) + 1
+                cls._dirty.add(auction_id)
+            
+            if cls._task is None:
+                cls._task = socketio.start_background_task(cls._run, current_app._get_current_object())
+    
+    @classmethod
+    def leave(cls, sid, auction_id):
+        """Stop counting a socket for an auction"""
+        with cls._lock:
+            joined = cls._sid_rooms.get(sid)
+            if not joined or auction_id not in joined:
+                return
+            joined.discard(auction_id)
+            if not joined:
+                del cls._sid_rooms[sid]
+            cls._decrement(auction_id)
+    
+    @classmethod
+    def disconnect(cls, sid):
+        """Drop every room a disconnected socket was counted in"""
+        with cls._lock:
+            for auction_id in cls._sid_rooms.pop(sid, ()):
+                cls._decrement(auction_id)
+    
+    @classmethod
+    def _decrement(cls, auction_id):
+        remaining = cls._rooms.get(auction_id, 0) - 1
+        if remaining > 0:
+            cls._rooms[auction_id] = remaining
+        else:
+            cls._rooms.pop(auction_id, None)
+        cls._dirty.add(auction_id)
+    
+    @classmethod
+    def local_count(cls, auction_id):
+        """Viewers of an auction connected to this node"""
+        return cls._rooms.get(auction_id, 0)
+    
+    @classmethod
+    def count(cls, auction_id):
+        """Viewers of an auction across all nodes (local count if Redis is down)"""
+        stale_after = current_app.config.get('PRESENCE_STALE_SECONDS', 30)
+        try:
+            values = RedisClient.get_client().hvals(cls._key(auction_id))
+        except Exception as e:
+            logger.error(f"Error reading auction presence: {str(e)}")
+            return cls.local_count(auction_id)
+        
+        now = time.time()
+        total = 0
+        for value in values:
+            viewers, updated_at = json.loads(value)
+            if now - updated_at < stale_after:
+                total += viewers
+        return total
+    
+    @classmethod
+    def sync(cls):
+        """Publish local counts and broadcast changed rooms"""
+        config = current_app.config
+        node_id = config['NODE_ID']
+        interval = config.get('PRESENCE_BROADCAST_INTERVAL', 1.0)
+        stale_after = config.get('PRESENCE_STALE_SECONDS', 30)
+        
+        with cls._lock:
+            counts = dict(cls._rooms)
+            dirty, cls._dirty = cls._dirty, set()
+        
+        now = time.time()
+        try:
+            client = RedisClient.get_client()
+            pipe = client.pipeline(transaction=False)
+            for auction_id in set(counts) | dirty:
+                key = cls._key(auction_id)
+                if counts.get(auction_id):
+                    pipe.hset(key, node_id, json.dumps([counts[auction_id], now]))
+                    pipe.expire(key, stale_after * 2)
+                else:
+                    pipe.hdel(key, node_id)
+            pipe.execute()
+        except Exception as e:
+            logger.error(f"Error publishing auction presence: {str(e)}")
+            client = None
+        
+        retry = set()
+        for auction_id in dirty:
+            # Whichever node takes the room's lock broadcasts the total
+            if client is not None:
+                try:
+                    if not client.set(f"{cls._key(auction_id)}:emit", node_id, nx=True, px=int(interval * 1000)):
+                        retry.add(auction_id)
+                        continue
+                except Exception as e:
+                    logger.error(f"Error locking auction presence broadcast: {str(e)}")
+            socketio.emit('viewer_count', {
+                'auction_id': auction_id,
+                'viewers': cls.count(auction_id) if client is not None else counts.get(auction_id, 0)
+            }, room=f'auction_{auction_id}')
+        
+        if retry:
+            with cls._lock:
+                cls._dirty |= retry
+    
+    @classmethod
+    def _run(cls, app):
+        interval = app.config.get('PRESENCE_BROADCAST_INTERVAL', 1.0)
+        while True:
+            socketio.sleep(interval)
+            with app.app_context():
+                try:
+                    cls.sync()
+                except Exception as e:
+                    logger.error(f"Auction presence error: {str(e)}")
+
+
+class UserPresence:
+    """Live socket connections per authenticated user
+    
+    Each node keeps a local count per user and mirrors it into a Redis hash
+    (``user_sockets:{user_id}``, field = NODE_ID) so a process without
+    sockets, such as the outbox worker, can tell whether a ``user_{id}``
+    emit would reach anyone. Lookups fail open: if Redis is unavailable the
+    user is treated as online.
+    """
+    
+    _counts = {}
+    _lock = threading.Lock()
+    
+    @staticmethod
+    def _key(user_id):
+        return f"user_sockets:{user_id}"
+    
+    @classmethod
+    def connect(cls, user_id):
+        """Record a new socket for a user"""
+        with cls._lock:
+            cls._counts[user_id] = cls._counts.get(user_id, 0) + 1
+        cls._publish(user_id, 1)
+    
+    @classmethod
+    def disconnect(cls, user_id):
+        """Record a closed socket for a user"""
+        with cls._lock:
+            remaining = cls._counts.get(user_id, 0) - 1
+            if remaining > 0:
+                cls._counts[user_id] = remaining
+            else:
+                cls._counts.pop(user_id, None)
+        cls._publish(user_id, -1)
+    
+    @classmethod
+    def _publish(cls, user_id, delta):
+        key = cls._key(user_id)
+        node_id = current_app.config['NODE_ID']
+        try:
+            client = RedisClient.get_client()
+            if client.hincrby(key, node_id, delta) <= 0:
+                client.hdel(key, node_id)
+            else:
+                client.expire(key, current_app.config.get('USER_PRESENCE_TTL', 86400))
+        except Exception as e:
+            logger.error(f"Error publishing user presence: {str(e)}")
+    
+    @classmethod
+    def local_count(cls, user_id):
+        """Sockets of a user connected to this node"""
+        return cls._counts.get(int(user_id), 0)
+    
+    @classmethod
+    def online_users(cls, user_ids):
+        """Return the subset of user IDs with at least one live socket"""
+        user_ids = {int(user_id) for user_id in user_ids}
+        online = {user_id for user_id in user_ids if cls.local_count(user_id)}
+        remote = [user_id for user_id in user_ids if user_id not in online]
+        if not remote:
+            return online
+        
+        try:
+            pipe = RedisClient.get_client().pipeline(transaction=False)
+            for user_id in remote:
+                pipe.hvals(cls._key(user_id))
+            results = pipe.execute()
+        except Exception as e:
+            logger.error(f"Error reading user presence: {str(e)}")
+            return user_ids
+        
+        for user_id, counts in zip(remote, results):
+            if sum(int(count) for count in counts) > 0:
+                online.add(user_id)
+        return online
+    
+    @classmethod
+    def is_online(cls, user_id):
+        """Check whether a user has a live socket on any node"""
+        return int(user_id) in cls.online_users([user_id])
+
+
+class TypingIndicator:
+    """Debounced "users typing" sets per auction room
+    
+    Typing events only refresh an expiry for (auction, user). A background
+    task runs every ``TYPING_BROADCAST_INTERVAL`` seconds, drops entries
+    older than ``TYPING_TTL`` and sends one ``user_typing`` message with the
+    full set of typing users to each room whose set changed. Entries are
+    shared through a Redis hash per auction so every node broadcasts the
+    same set; without Redis each node broadcasts its local set.
+    """
+    
+    _typing = {}
+    _changes = {}
+    _lock = threading.Lock()
+    _task = None
+    
+    @staticmethod
+    def _key(auction_id):
+        return f"auction_typing:{auction_id}"
+    
+    @classmethod
+    def update(cls, auction_id, user_id, is_typing=True):
+        """Record that a user started, kept or stopped typing"""
+        ttl = current_app.config.get('TYPING_TTL', 5)
+        with cls._lock:
+            users = cls._typing.setdefault(auction_id, {})
+            if is_typing:
+                # Only a user appearing in the set changes what the room sees
+                if user_id not in users:
+                    cls._changes.setdefault(auction_id, {})[user_id] = True
+                users[user_id] = time.time() + ttl
+            elif users.pop(user_id, None) is not None:
+                cls._changes.setdefault(auction_id, {})[user_id] = False
+            
+            if cls._task is None:
+                cls._task = socketio.start_background_task(cls._run, current_app._get_current_object())
+    
+    @classmethod
+    def sync(cls):
+        """Expire entries and broadcast every room whose set changed"""
+        now = time.time()
+        with cls._lock:
+            for auction_id, users in list(cls._typing.items()):
+                for user_id, expires_at in list(users.items()):
+                    if expires_at <= now:
+                        del users[user_id]
+                        cls._changes.setdefault(auction_id, {})[user_id] = False
+                if not users:
+                    del cls._typing[auction_id]
+            changes, cls._changes = cls._changes, {}
+            local = {auction_id: dict(users) for auction_id, users in cls._typing.items()}
+        
+        if not changes and not local:
+            return
+        
+        typing = cls._share(changes, local, now)
+        for auction_id, user_ids in typing.items():
+            socketio.emit('user_typing', {
+                'auction_id': auction_id,
+                'user_ids': sorted(user_ids)
+            }, room=f'auction_{auction_id}')
+    
+    @classmethod
+    def _share(cls, changes, local, now):
+        """Publish local entries and return the merged set of each changed room"""
+        ttl = current_app.config.get('TYPING_TTL', 5)
+        try:
+            client = RedisClient.get_client()
+            pipe = client.pipeline(transaction=False)
+            for auction_id, users in local.items():
+                pipe.hset(cls._key(auction_id), mapping=users)
+                pipe.expire(cls._key(auction_id), ttl * 2)
+            for auction_id, users in changes.items():
+                stopped = [user_id for user_id, is_typing in users.items() if not is_typing]
+                if stopped:
+                    pipe.hdel(cls._key(auction_id), *stopped)
+            pipe.execute()
+            
+            pipe = client.pipeline(transaction=False)
+            for auction_id in changes:
+                pipe.hgetall(cls._key(auction_id))
+            shared = pipe.execute()
+        except Exception as e:
+            logger.error(f"Error sharing typing indicators: {str(e)}")
+            return {auction_id: set(local.get(auction_id, {})) for auction_id in changes}
+        
+        return {
+            auction_id: {int(user_id) for user_id, expires_at in entries.items() if float(expires_at) > now}
+            for auction_id, entries in zip(changes, shared)
+        }
+    
+    @classmethod
+    def _run(cls, app):
+        interval = app.config.get('TYPING_BROADCAST_INTERVAL', 2.0)
+        while True:
+            socketio.sleep(interval)
+            with app.app_context():
+                try:
+                    cls.sync()
+                except Exception as e:
+                    logger.error(f"Typing indicator error: {str(e)}")
@@ -0,0 +1,107 @@
+"""Per-request SQL query counts, timing and N+1 detection"""
+
+import logging
+import time
+from collections import Counter
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from app.utils.metrics import Metrics
+
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(Exception):
+    """Raised when QUERY_BUDGET_ENFORCE is on and an endpoint runs too many queries"""
+
+
+class QueryStats:
+    """Count and time the SQL statements each HTTP request executes
+    
+    Cursor events on every engine add to ``g.query_stats``. After the
+    request the totals go out as a ``Server-Timing`` header (``db`` and
+    ``app`` durations) and into the ``http_request_db_queries`` and
+    ``http_request_db_seconds`` histograms per endpoint.
+    
+    A statement shape (the SQL text with its bound parameters left out)
+    that runs QUERY_REPEAT_THRESHOLD times or more in one request is
+    almost always a lazy load inside a loop; it is logged and counted in
+    ``db_repeated_queries_total``.
+    
+    Each endpoint may run QUERY_BUDGETS[endpoint] queries, or
+    QUERY_BUDGET_DEFAULT when unlisted (0 means no budget). Going over is
+    logged after the request. With QUERY_BUDGET_ENFORCE set, as it is in
+    testing, the statement that goes over raises QueryBudgetExceeded
+    instead, so the view fails before it can commit.
+    """
+    
+    @classmethod
+    def install(cls, engine):
+        """Listen to statement execution on an engine"""
+        if event.contains(engine, 'before_cursor_execute', cls._before_execute):
+            return
+        event.listen(engine, 'before_cursor_execute', cls._before_execute)
+        event.listen(engine, 'after_cursor_execute', cls._after_execute)
+    
+    @staticmethod
+    def _before_execute(conn, cursor, statement, parameters, context, executemany):
+        context.query_started = time.perf_counter()
+    
+    @staticmethod
+    def _after_execute(conn, cursor, statement, parameters, context, executemany):
+        stats = g.get('query_stats') if has_request_context() else None
+        if stats is None:
+            return
+        stats['count'] += 1
+        stats['seconds'] += time.perf_counter() - context.query_started
+        stats['shapes'][statement] += 1
+        if stats['enforce'] and stats['count'] > stats['budget']:
+            raise QueryBudgetExceeded(f"{request.endpoint} ran {stats['count']} queries, budget is {stats['budget']}")
+    
+    @classmethod
+    def before_request(cls):
+        config = current_app.config
+        budget = config.get('QUERY_BUDGETS', {}).get(request.endpoint, config.get('QUERY_BUDGET_DEFAULT', 0))
+        g.query_stats = {
+            'count': 0,
+            'seconds': 0.0,
+            'shapes': Counter(),
+            'started': time.perf_counter(),
+            'budget': budget,
+            'enforce': bool(budget and config.get('QUERY_BUDGET_ENFORCE'))
+        }
+    
+    @classmethod
+    def after_request(cls, response):
+        """Report the request's queries"""
+        stats = g.pop('query_stats', None)
+        if stats is None:
+            return response
+        config = current_app.config
+        endpoint = request.endpoint or 'unknown'
+        count, seconds = stats['count'], stats['seconds']
+        
+        elapsed = time.perf_counter() - stats['started']
+        response.headers['Server-Timing'] = (
+            f'db;dur={seconds * 1000:.1f};desc="{count} queries", app;dur={elapsed * 1000:.1f}'
+        )
+        Metrics.observe('http_request_db_queries', count, endpoint=endpoint)
+        Metrics.observe('http_request_db_seconds', seconds, endpoint=endpoint)
+        
+        threshold = config.get('QUERY_REPEAT_THRESHOLD', 5)
+        repeated = [(shape, times) for shape, times in stats['shapes'].most_common() if times >= threshold]
+        if repeated:
+            Metrics.inc('db_repeated_queries_total', endpoint=endpoint)
+            shape, times = repeated[0]
+            logger.warning(f"{endpoint} ran the same query {times} times (possible N+1): {' '.join(shape.split())[:200]}")
+        
+        if stats['budget'] and count > stats['budget']:
+            logger.warning(f"{endpoint} ran {count} queries, budget is {stats['budget']}")
+        return response
+
+
+Metrics.histogram('http_request_db_queries', (1, 2, 5, 10, 20, 50, 100, 200),
+                  'SQL queries per HTTP request by endpoint')
+Metrics.histogram('http_request_db_seconds', Metrics.DEFAULT_BUCKETS,
+                  'Time spent in SQL per HTTP request by endpoint')
+Metrics.describe('db_repeated_queries_total', 'Requests that ran one statement shape QUERY_REPEAT_THRESHOLD times or more')
@@ -0,0 +1,113 @@
+"""Keys, costs and a local flood check for HTTP rate limits"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app, g, request
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+from flask_limiter.util import get_remote_address
+from limits import parse
+from app.utils.metrics import Metrics
+from app.utils.validators import error_response
+
+
+logger = logging.getLogger(__name__)
+
+# Per user, over REST and Socket.IO together
+BID_RATE_LIMIT = "30 per hour"
+
+
+def rate_limit_key():
+    """Limit signed-in users by identity and everyone else by client IP
+    
+    Dealers behind one NAT would otherwise share a single budget. A
+    missing, expired or revoked token falls back to the IP.
+    """
+    key = g.get('rate_limit_key')
+    if key is None:
+        try:
+            verify_jwt_in_request(optional=True)
+            identity = get_jwt_identity()
+        except Exception:
+            identity = None
+        key = f'user:{identity}' if identity else f'ip:{get_remote_address()}'
+        g.rate_limit_key = key
+    return key
+
+
+def request_cost():
+    """Cost of the current request against the default limits
+    
+    ``RATELIMIT_ROUTE_COSTS`` maps endpoint names to a weight; unlisted
+    endpoints cost 1.
+    """
+    return current_app.config.get('RATELIMIT_ROUTE_COSTS', {}).get(request.endpoint, 1)
+
+
+def hit_route_limit(limit, endpoint, key):
+    """Count one call against a route's ``@limiter.limit`` outside of HTTP
+    
+    Socket.IO events use it to share the budget of the matching route: the
+    hit goes to the same storage and counter as the route's own check.
+    Returns False when the limit is exceeded; storage errors let the call
+    through, as the in-memory fallback would.
+    """
+    from app import limiter
+    config = current_app.config
+    if not config.get('RATELIMIT_ENABLED', True):
+        return True
+    args = [key, endpoint]
+    if config.get('RATELIMIT_KEY_PREFIX'):
+        args.insert(0, config['RATELIMIT_KEY_PREFIX'])
+    try:
+        return limiter.limiter.hit(parse(limit), *args)
+    except Exception as e:
+        logger.error(f"Error checking rate limit for {endpoint}: {str(e)}")
+        return True
+
+
+class LocalRateGuard:
+    """In-process token bucket in front of the Redis limits
+    
+    Each key gets RATELIMIT_LOCAL_BURST cost units refilled at
+    RATELIMIT_LOCAL_RATE per second. It is deliberately looser than the
+    real limits and only exists to turn away floods without a Redis round
+    trip; each node keeps its own buckets.
+    """
+    
+    _buckets = OrderedDict()
+    _lock = threading.Lock()
+    
+    @classmethod
+    def allow(cls, key, cost):
+        """Take ``cost`` tokens for a key, returns False when it can't"""
+        config = current_app.config
+        rate = config.get('RATELIMIT_LOCAL_RATE', 20)
+        burst = config.get('RATELIMIT_LOCAL_BURST', 100)
+        max_keys = config.get('RATELIMIT_LOCAL_KEYS', 10000)
+        now = time.monotonic()
+        
+        with cls._lock:
+            tokens, last = cls._buckets.pop(key, (burst, now))
+            tokens = min(burst, tokens + (now - last) * rate)
+            allowed = tokens >= cost
+            cls._buckets[key] = (tokens - cost if allowed else tokens, now)
+            while len(cls._buckets) > max_keys:
+                cls._buckets.popitem(last=False)
+        return allowed
+    
+    @classmethod
+    def check_request(cls):
+        """before_request hook: reject the request if the local bucket is empty"""
+        if not current_app.config.get('RATELIMIT_ENABLED', True) or request.endpoint is None:
+            return None
+        if cls.allow(rate_limit_key(), request_cost()):
+            return None
+        Metrics.inc('rate_limit_local_rejections_total')
+        response, status = error_response('Rate limit exceeded', 429)
+        response.headers['Retry-After'] = '1'
+        return response, status
+
+
+Metrics.describe('rate_limit_local_rejections_total', 'Requests rejected by the local flood check before Redis')
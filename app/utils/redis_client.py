@@ -0,0 +1,214 @@
+"""Shared Redis client for the process"""
+
+import logging
+import threading
+import time
+import redis
+from redis.client import Pipeline
+from flask import current_app
+from app.utils.metrics import Metrics
+
+
+logger = logging.getLogger(__name__)
+
+
+class RedisUnavailable(redis.ConnectionError):
+    """Raised without touching the network while the circuit is open"""
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker
+    
+    After ``failure_threshold`` failures in a row the circuit opens and
+    every call is refused for ``reset_timeout`` seconds. The first call
+    after that is let through as a trial: success closes the circuit,
+    failure opens it again.
+    """
+    
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+    
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0
+        self._lock = threading.Lock()
+    
+    def allow(self):
+        """Whether a call may go to Redis right now"""
+        if self.state == self.CLOSED:
+            return True
+        with self._lock:
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                return True
+            return False
+    
+    def record_success(self):
+        if self.state == self.CLOSED and not self.failures:
+            return
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info("Redis circuit closed")
+            self.state = self.CLOSED
+            self.failures = 0
+    
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or (
+                self.state == self.CLOSED and self.failures >= self.failure_threshold
+            ):
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+                Metrics.inc('redis_circuit_opened_total')
+                logger.warning(f"Redis circuit opened after {self.failures} consecutive failures")
+    
+    def call(self, func, *args, **kwargs):
+        """Run a Redis call and record whether it reached the server"""
+        try:
+            result = func(*args, **kwargs)
+        except RedisUnavailable:
+            raise
+        except (redis.ConnectionError, redis.TimeoutError):
+            Metrics.inc('redis_connection_errors_total')
+            self.record_failure()
+            raise
+        self.record_success()
+        return result
+
+
+class BreakerConnectionPool(redis.BlockingConnectionPool):
+    """BlockingConnectionPool that refuses checkouts while the circuit is open
+    
+    While the circuit is open, checkout raises RedisUnavailable at once.
+    Failures are recorded by BreakerRedis, which sees the whole command.
+    """
+    
+    def __init__(self, *args, breaker=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.breaker = breaker
+    
+    def get_connection(self, *args, **kwargs):
+        if self.breaker is not None and not self.breaker.allow():
+            Metrics.inc('redis_calls_short_circuited_total')
+            raise RedisUnavailable("Redis circuit is open")
+        return super().get_connection(*args, **kwargs)
+    
+    def stats(self):
+        """Connections currently checked out and idle in the pool"""
+        idle = sum(1 for connection in list(self.pool.queue) if connection is not None)
+        return len(self._connections) - idle, idle
+
+
+class BreakerRedis(redis.Redis):
+    """Redis client that reports every command to the pool's circuit breaker
+    
+    A hung server mostly shows up as socket timeouts on connections that
+    are already open, while sending a command, reading its reply or running
+    the health check before it, so commands and pipelines are what count:
+    connection errors and timeouts (including waiting longer than
+    REDIS_POOL_TIMEOUT for a free connection) are failures, and only a
+    command that got its reply counts as a success.
+    """
+    
+    def execute_command(self, *args, **options):
+        breaker = self.connection_pool.breaker
+        if breaker is None:
+            return super().execute_command(*args, **options)
+        return breaker.call(super().execute_command, *args, **options)
+    
+    def pipeline(self, transaction=True, shard_hint=None):
+        return BreakerPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+
+class BreakerPipeline(Pipeline):
+    """Pipeline whose execution is reported to the circuit breaker"""
+    
+    def execute(self, raise_on_error=True):
+        breaker = self.connection_pool.breaker
+        if breaker is None or not (self.command_stack or self.watching):
+            return super().execute(raise_on_error)
+        return breaker.call(super().execute, raise_on_error)
+
+
+class RedisClient:
+    """One Redis connection pool per process
+    
+    Under eventlet or gevent every green thread that touches Redis would
+    otherwise open its own socket, so the pool is a BlockingConnectionPool
+    capped at REDIS_MAX_CONNECTIONS: callers wait for a free connection
+    instead of exhausting file descriptors. The same pool backs
+    Flask-Limiter's storage.
+    
+    Socket timeouts bound every call, and a circuit breaker stops new calls
+    after REDIS_BREAKER_FAILURES consecutive failed commands so that
+    callers go straight to their local fallback instead of each waiting on
+    a timeout.
+    """
+    
+    _client = None
+    _pool = None
+    _lock = threading.Lock()
+    
+    @classmethod
+    def get_pool(cls, config=None):
+        """Get or create the shared connection pool"""
+        if cls._pool is None:
+            with cls._lock:
+                if cls._pool is None:
+                    config = config if config is not None else current_app.config
+                    breaker = CircuitBreaker(
+                        config.get('REDIS_BREAKER_FAILURES', 5),
+                        config.get('REDIS_BREAKER_RESET_SECONDS', 30)
+                    )
+                    cls._pool = BreakerConnectionPool.from_url(
+                        config.get('REDIS_URL', 'redis://localhost:6379/0'),
+                        max_connections=config.get('REDIS_MAX_CONNECTIONS', 50),
+                        timeout=config.get('REDIS_POOL_TIMEOUT', 5),
+                        socket_timeout=config.get('REDIS_SOCKET_TIMEOUT', 2.0),
+                        socket_connect_timeout=config.get('REDIS_CONNECT_TIMEOUT', 1.0),
+                        health_check_interval=config.get('REDIS_HEALTH_CHECK_INTERVAL', 30),
+                        decode_responses=True,
+                        breaker=breaker
+                    )
+        return cls._pool
+    
+    @classmethod
+    def get_client(cls):
+        """Get or create the shared Redis client"""
+        if cls._client is None:
+            pool = cls.get_pool()
+            with cls._lock:
+                if cls._client is None:
+                    cls._client = BreakerRedis(connection_pool=pool)
+        return cls._client
+    
+    @classmethod
+    def available(cls):
+        """False while the circuit is open, without touching the network"""
+        pool = cls._pool
+        return pool is None or pool.breaker.state != CircuitBreaker.OPEN
+    
+    @classmethod
+    def _pool_connections(cls):
+        if cls._pool is None:
+            return {}
+        in_use, idle = cls._pool.stats()
+        return {(('state', 'in_use'),): in_use, (('state', 'idle'),): idle}
+    
+    @classmethod
+    def _circuit_open(cls):
+        return 0 if cls.available() else 1
+
+
+Metrics.register_gauge('redis_pool_connections', RedisClient._pool_connections,
+                       'Redis connections in the shared pool by state')
+Metrics.register_gauge('redis_circuit_open', RedisClient._circuit_open,
+                       'Whether the Redis circuit breaker is open')
+Metrics.describe('redis_connection_errors_total', 'Redis commands that failed with a connection error or timeout')
+Metrics.describe('redis_circuit_opened_total', 'Times the Redis circuit breaker opened')
+Metrics.describe('redis_calls_short_circuited_total', 'Redis calls refused while the circuit was open')
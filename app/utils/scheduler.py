@@ -3,11 +3,13 @@ from datetime import datetime, timedelta
 from app import db
 from app.models.auction import Auction
 from app.models.bid import Bid
+from app.utils.db_pool import ReservedPool
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+@ReservedPool.use()
 def close_expired_auctions(app):
     """Close auctions that have passed their end time"""
     try:
@@ -30,6 +32,7 @@ def close_expired_auctions(app):
         db.session.rollback()
 
 
+@ReservedPool.use()
 def check_auction_extensions(app):
     """Check for last-minute bids and extend auctions"""
     try:
@@ -63,8 +66,69 @@ def check_auction_extensions(app):
         db.session.rollback()
 
 
+@ReservedPool.use()
+def notify_watchers_auction_ending(app):
+    """Queue 'ending soon' notifications for watchers of auctions about to close"""
+    try:
+        with app.app_context():
+            from app.utils.watcher_fanout import WatcherFanoutService
+            
+            now = datetime.utcnow()
+            ending_soon = Auction.query.filter(
+                Auction.status == 'active',
+                Auction.ends_at > now,
+                Auction.ends_at <= now + timedelta(minutes=app.config.get('AUCTION_ENDING_NOTICE_MINUTES', 15))
+            ).all()
+            
+            for auction in ending_soon:
+                minutes_left = max(int((auction.ends_at - now).total_seconds() // 60), 1)
+                WatcherFanoutService.enqueue_ending(auction.id, f"{minutes_left} minutes")
+            
+            if ending_soon:
+                db.session.commit()
+    
+    except Exception as e:
+        logger.error(f"Error notifying watchers of ending auctions: {str(e)}")
+        db.session.rollback()
+
+
+def maintain_notification_partitions(app):
+    """Create upcoming notification partitions and expire old ones"""
+    try:
+        with app.app_context():
+            from app.utils.notification_retention import NotificationRetentionService
+            
+            NotificationRetentionService.ensure_partitions()
+            expired = NotificationRetentionService.apply_retention()
+            
+            if expired:
+                logger.info(f"Expired {len(expired)} notification partitions: {', '.join(expired)}")
+    
+    except Exception as e:
+        logger.error(f"Error maintaining notification partitions: {str(e)}")
+        db.session.rollback()
+
+
+def purge_delivered_outbox_events(app):
+    """Delete outbox events that were delivered a while ago"""
+    try:
+        with app.app_context():
+            from app.utils.outbox import OutboxService
+            
+            deleted = OutboxService.purge_delivered()
+            if deleted:
+                logger.info(f"Purged {deleted} delivered outbox events")
+    
+    except Exception as e:
+        logger.error(f"Error purging outbox events: {str(e)}")
+        db.session.rollback()
+
+
 def start_scheduler(app):
-    """Start the auction scheduler"""
+    """Start the auction scheduler (once per app)"""
+    if 'auction_scheduler' in app.extensions:
+        return app.extensions['auction_scheduler']
+    
     scheduler = BackgroundScheduler()
     
     # Close expired auctions every minute
@@ -85,6 +149,34 @@ def start_scheduler(app):
         replace_existing=True
     )
     
+    # Remind watchers of auctions ending soon
+    scheduler.add_job(
+        func=lambda: notify_watchers_auction_ending(app),
+        trigger="interval",
+        seconds=app.config.get('AUCTION_CHECK_INTERVAL', 60),
+        id='notify_watchers_auction_ending',
+        replace_existing=True
+    )
+    
+    # Roll notification partitions forward and apply retention daily
+    scheduler.add_job(
+        func=lambda: maintain_notification_partitions(app),
+        trigger="interval",
+        hours=24,
+        id='maintain_notification_partitions',
+        replace_existing=True
+    )
+    
+    # Purge delivered outbox events hourly
+    scheduler.add_job(
+        func=lambda: purge_delivered_outbox_events(app),
+        trigger="interval",
+        hours=1,
+        id='purge_delivered_outbox_events',
+        replace_existing=True
+    )
+    
     scheduler.start()
+    app.extensions['auction_scheduler'] = scheduler
     app.logger.info("Auction scheduler started")
     return scheduler
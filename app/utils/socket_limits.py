@@ -0,0 +1,204 @@
+"""Inbound rate limits and outbound backpressure for Socket.io connections"""
+
+import json
+import re
+import threading
+import time
+from collections import deque
+from functools import lru_cache, wraps
+from engineio import packet
+from flask import current_app, request
+from app.utils.metrics import Metrics
+
+
+class SocketRateLimiter:
+    """Token bucket per connection and event
+    
+    ``SOCKET_RATE_LIMITS`` maps an event name to ``(rate per second,
+    burst)``. Events without an entry are not limited. A throttled event is
+    dropped without a broadcast; handlers that clients call with an
+    acknowledgement get ``{'success': False, 'status': 429}`` back.
+    """
+    
+    _buckets = {}
+    _lock = threading.Lock()
+    
+    @classmethod
+    def allow(cls, sid, event):
+        """Take a token for an event, returns False when the bucket is empty"""
+        limit = current_app.config.get('SOCKET_RATE_LIMITS', {}).get(event)
+        if limit is None:
+            return True
+        
+        rate, burst = limit
+        now = time.monotonic()
+        with cls._lock:
+            buckets = cls._buckets.setdefault(sid, {})
+            tokens, last = buckets.get(event, (burst, now))
+            tokens = min(burst, tokens + (now - last) * rate)
+            allowed = tokens >= 1
+            buckets[event] = (tokens - 1 if allowed else tokens, now)
+        
+        if not allowed:
+            Metrics.inc('socket_events_throttled_total', event=event)
+        return allowed
+    
+    @classmethod
+    def forget(cls, sid):
+        """Drop the buckets of a disconnected socket"""
+        with cls._lock:
+            cls._buckets.pop(sid, None)
+    
+    @classmethod
+    def limited(cls, event):
+        """Decorator applying the event's rate limit to a socket handler"""
+        def decorator(f):
+            @wraps(f)
+            def decorated_function(*args, **kwargs):
+                if not cls.allow(request.sid, event):
+                    return {'success': False, 'message': 'Rate limit exceeded', 'status': 429}
+                return f(*args, **kwargs)
+            return decorated_function
+        return decorator
+
+
+class OutboundBacklog:
+    """Packets held back from one connection's Engine.IO queue"""
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.packets = deque()
+        self.started = False
+        self.retired = False
+
+
+class SocketBackpressure:
+    """Bound the outbound packet queue of every connection
+    
+    Engine.IO queues packets per connection without limit, so a client that
+    reads slower than the server writes grows its queue for as long as it
+    stays connected. ``install`` wraps the Engine.IO server's
+    ``send_packet``: once a connection has ``SOCKET_MAX_OUTBOUND_QUEUE``
+    packets waiting, further packets are held in a backlog of its own and a
+    background task hands them to Engine.IO, in order, as the client reads.
+    Engine.IO's queue itself is never modified.
+    
+    A ``new_bid`` snapshot entering the backlog replaces the held snapshot
+    of the same auction it supersedes, so the client only ever gets the
+    latest state of each auction and can spot gaps in ``seq``. Nothing else
+    is dropped: pings, acks, ``auction_sync`` replies, notifications and
+    binary packets (msgpack snapshots and their attachments) are held in
+    order. A client whose backlog still reaches the limit is disconnected
+    and resyncs with ``last_seq`` when it reconnects.
+    """
+    
+    # Text Socket.IO EVENT packet for new_bid, with an optional namespace
+    STATE_PACKET = re.compile(r'2(/[^,]*,)?\d*(?=\["new_bid",)')
+    
+    # Seconds between checks of a connection's queue while packets are held
+    FLUSH_INTERVAL = 0.05
+    
+    _backlogs = {}
+    _lock = threading.Lock()
+    
+    @classmethod
+    @lru_cache(maxsize=1024)
+    def state_key(cls, data):
+        """(namespace, auction_id) of a text new_bid packet, None for anything else"""
+        match = cls.STATE_PACKET.match(data)
+        if match is None:
+            return None
+        try:
+            state = json.loads(data[match.end():])[1]
+        except (ValueError, IndexError):
+            return None
+        auction_id = state.get('auction_id') if isinstance(state, dict) else state[0] if state else None
+        return (match.group(1) or '/', auction_id) if auction_id is not None else None
+    
+    @classmethod
+    def _hold(cls, backlog, pkt):
+        """Add a packet to a backlog, returns how many held packets it replaced"""
+        key = None
+        if pkt.packet_type == packet.MESSAGE and not pkt.binary and isinstance(pkt.data, str):
+            key = cls.state_key(pkt.data)
+        
+        dropped = 0
+        if key is not None:
+            for index, (held_key, _) in enumerate(backlog.packets):
+                if held_key == key:
+                    del backlog.packets[index]
+                    dropped = 1
+                    break
+        backlog.packets.append((key, pkt))
+        return dropped
+    
+    @classmethod
+    def _retire(cls, sid, backlog):
+        """Forget an empty backlog, called with its lock held"""
+        backlog.retired = True
+        with cls._lock:
+            if cls._backlogs.get(sid) is backlog:
+                del cls._backlogs[sid]
+    
+    @classmethod
+    def _flush(cls, eio, send_packet, sid, backlog, max_queue):
+        """Hand held packets to Engine.IO as the connection's queue drains"""
+        while True:
+            eio.sleep(cls.FLUSH_INTERVAL)
+            socket = eio.sockets.get(sid)
+            with backlog.lock:
+                if socket is None or socket.closing or socket.closed:
+                    backlog.packets.clear()
+                while backlog.packets and socket.queue.qsize() < max_queue:
+                    send_packet(sid, backlog.packets.popleft()[1])
+                if not backlog.packets:
+                    cls._retire(sid, backlog)
+                    return
+    
+    @classmethod
+    def install(cls, eio, max_queue):
+        """Wrap eio.send_packet with the queue bound"""
+        if max_queue <= 0 or getattr(eio.send_packet, 'bounded', False):
+            return
+        
+        send_packet = eio.send_packet
+        
+        def bounded_send_packet(sid, pkt):
+            socket = eio.sockets.get(sid)
+            if socket is None or socket.closing or socket.closed:
+                return send_packet(sid, pkt)
+            if sid not in cls._backlogs and socket.queue.qsize() < max_queue:
+                return send_packet(sid, pkt)
+            
+            while True:
+                with cls._lock:
+                    backlog = cls._backlogs.setdefault(sid, OutboundBacklog())
+                with backlog.lock:
+                    # Retired by its flush task while this call waited
+                    if backlog.retired:
+                        continue
+                    if not backlog.packets and socket.queue.qsize() < max_queue:
+                        cls._retire(sid, backlog)
+                        return send_packet(sid, pkt)
+                    
+                    dropped = cls._hold(backlog, pkt)
+                    if dropped:
+                        Metrics.inc('socket_packets_dropped_total', dropped)
+                    if len(backlog.packets) >= max_queue:
+                        Metrics.inc('socket_slow_clients_disconnected_total')
+                        backlog.packets.clear()
+                        cls._retire(sid, backlog)
+                        socket.close(wait=False, abort=True)
+                        return
+                    if not backlog.started:
+                        backlog.started = True
+                        eio.start_background_task(cls._flush, eio, send_packet, sid, backlog, max_queue)
+                    return
+        
+        bounded_send_packet.bounded = True
+        eio.send_packet = bounded_send_packet
+
+
+Metrics.describe('socket_events_throttled_total', 'Inbound socket events dropped by per-connection rate limits')
+Metrics.describe('socket_packets_dropped_total', 'Superseded auction snapshots dropped from connection backlogs')
+Metrics.describe('socket_slow_clients_disconnected_total', 'Connections closed because their outbound backlog kept growing')
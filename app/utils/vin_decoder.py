@@ -1,5 +1,6 @@
 import requests
 from flask import current_app
+from app.utils.db_pool import PoolMonitor
 
 
 class VINDecoder:
@@ -14,7 +15,8 @@ class VINDecoder:
             return {'error': 'Invalid VIN. Must be 17 characters'}
         
         try:
-            response = requests.get(cls.NHTSA_API_URL.format(vin), timeout=10)
+            with PoolMonitor.external_call('nhtsa_vin_decode'):
+                response = requests.get(cls.NHTSA_API_URL.format(vin), timeout=10)
             response.raise_for_status()
             data = response.json()
             
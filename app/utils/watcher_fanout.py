@@ -0,0 +1,140 @@
+"""Watcher fan-out pipeline for auction watchlist notifications"""
+
+import logging
+from flask import current_app
+from app import db
+from app.models.auction import Auction
+from app.models.watchlist import Watchlist
+from app.utils.notification_service import NotificationService
+from app.utils.outbox import OutboxService
+from app.utils.redis_client import RedisClient
+
+
+logger = logging.getLogger(__name__)
+
+
+class WatcherFanoutService:
+    """Notify auction watchers off the request path
+    
+    Bid and ending events are queued in the outbox with the transaction that
+    produced them and delivered by the outbox dispatcher. Each delivery
+    selects the eligible watchers with a single query against the partial
+    index for the matching Watchlist flag, writes all notifications in one
+    batch and emits them to the watchers' ``user_{id}`` rooms. Repeated
+    events for the same watcher and auction are debounced within
+    ``WATCHER_NOTIFY_DEBOUNCE_SECONDS`` through keys in Redis, so the
+    window holds across processes and restarts.
+    
+    The outbid notice goes to the leader recorded when the bid was placed;
+    by delivery time later bids may already have been committed.
+    """
+    
+    @staticmethod
+    def enqueue_bid(auction_id, bidder_id, bid_amount, previous_bidder_id=None):
+        """Queue watcher and outbid notifications for an accepted bid"""
+        OutboxService.enqueue('watcher_bid', {
+            'auction_id': auction_id,
+            'bidder_id': int(bidder_id),
+            'bid_amount': bid_amount,
+            'previous_bidder_id': previous_bidder_id
+        })
+    
+    @staticmethod
+    def enqueue_ending(auction_id, time_remaining):
+        """Queue 'ending soon' notifications for an auction's watchers"""
+        OutboxService.enqueue('watcher_ending', {
+            'auction_id': auction_id,
+            'time_remaining': time_remaining
+        })
+    
+    @classmethod
+    def fan_out_bid(cls, auction_id, bidder_id, bid_amount, previous_bidder_id=None):
+        """Notify the outbid bidder and every watcher with notify_on_bid set"""
+        auction = Auction.query.get(auction_id)
+        if not auction:
+            return 0
+        
+        bidder_id = int(bidder_id)
+        excluded = {bidder_id, auction.seller_id}
+        rows = []
+        
+        # Previous highest bidder gets a dedicated outbid notice unless they
+        # are watching the auction with notify_on_outbid turned off
+        if previous_bidder_id is not None and int(previous_bidder_id) != bidder_id:
+            previous_bidder_id = int(previous_bidder_id)
+            excluded.add(previous_bidder_id)
+            muted = Watchlist.query.filter_by(
+                auction_id=auction_id,
+                user_id=previous_bidder_id,
+                notify_on_outbid=False
+            ).first()
+            if not muted:
+                rows.append({
+                    'user_id': previous_bidder_id,
+                    'notification_type': 'outbid',
+                    'title': "You've Been Outbid",
+                    'message': f"Someone placed a higher bid on {auction.title}. Current price: ${bid_amount:,.2f}",
+                    'related_auction_id': auction_id
+                })
+        
+        watcher_ids = cls._select_watchers(auction_id, Watchlist.notify_on_bid, excluded)
+        window = current_app.config.get('WATCHER_NOTIFY_DEBOUNCE_SECONDS', 60)
+        for user_id in cls._debounce(watcher_ids, auction_id, 'bid', window):
+            rows.append({
+                'user_id': user_id,
+                'notification_type': 'watched_bid',
+                'title': 'New Bid on Watched Auction',
+                'message': f"A bid of ${bid_amount:,.2f} was placed on {auction.title}",
+                'related_auction_id': auction_id
+            })
+        
+        NotificationService.create_and_emit_bulk(rows)
+        return len(rows)
+    
+    @classmethod
+    def fan_out_ending(cls, auction_id, time_remaining):
+        """Notify every watcher with notify_on_ending set"""
+        auction = Auction.query.get(auction_id)
+        if not auction:
+            return 0
+        
+        watcher_ids = cls._select_watchers(auction_id, Watchlist.notify_on_ending, {auction.seller_id})
+        # One reminder per auction: the window covers the whole notice period
+        window = current_app.config.get('AUCTION_ENDING_NOTICE_MINUTES', 15) * 60
+        rows = [{
+            'user_id': user_id,
+            'notification_type': 'auction_ending',
+            'title': 'Auction Ending Soon',
+            'message': f"{auction.title} is ending in {time_remaining}",
+            'related_auction_id': auction_id
+        } for user_id in cls._debounce(watcher_ids, auction_id, 'ending', window)]
+        
+        NotificationService.create_and_emit_bulk(rows)
+        return len(rows)
+    
+    @staticmethod
+    def _select_watchers(auction_id, flag_column, excluded):
+        """Fetch watcher user IDs for an auction where the given flag is set"""
+        query = db.session.query(Watchlist.user_id).filter(
+            Watchlist.auction_id == auction_id,
+            flag_column == True
+        )
+        if excluded:
+            query = query.filter(Watchlist.user_id.notin_(excluded))
+        return [row.user_id for row in query.all()]
+    
+    @staticmethod
+    def _debounce(user_ids, auction_id, event, window):
+        """Drop watchers already notified about this auction within the window"""
+        if not user_ids:
+            return []
+        try:
+            pipe = RedisClient.get_client().pipeline(transaction=False)
+            for user_id in user_ids:
+                pipe.set(f'watcher_notified:{event}:{auction_id}:{user_id}', 1, nx=True, ex=int(window))
+            first = pipe.execute()
+        except Exception as e:
+            # Better a repeated notice than none
+            logger.error(f"Error debouncing watcher notifications: {str(e)}")
+            return list(user_ids)
+        return [user_id for user_id, acquired in zip(user_ids, first) if acquired]
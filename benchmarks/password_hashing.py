@@ -0,0 +1,88 @@
+"""Login password verification throughput benchmark
+
+Verifies one stored hash repeatedly from concurrent request threads, first
+in the request threads themselves (the old behaviour) and then through
+PasswordHasher's process pool, and reports logins per second overall and
+per core. Alongside, a thread doing a cheap request-sized task measures
+how long other requests wait while the logins run.
+    
+    python benchmarks/password_hashing.py --threads 32 --logins 200
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask  # noqa: E402
+from werkzeug.security import generate_password_hash  # noqa: E402
+from app.utils.password_hasher import PasswordHasher, PasswordHashingBusy  # noqa: E402
+
+
+def measure(app, threads, logins, password_hash):
+    """Run ``logins`` verifications from ``threads`` threads
+    
+    Returns:
+        (logins per second, rejected logins, worst stall of a bystander task in ms)
+    """
+    stop = threading.Event()
+    stalls = []
+    
+    def bystander():
+        while not stop.is_set():
+            started = time.perf_counter()
+            sum(range(1000))
+            stalls.append(time.perf_counter() - started)
+            time.sleep(0.001)
+    
+    def login(_):
+        with app.app_context():
+            try:
+                return PasswordHasher.verify(password_hash, 'correct horse battery staple')
+            except PasswordHashingBusy:
+                return None
+    
+    watcher = threading.Thread(target=bystander, daemon=True)
+    watcher.start()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(login, range(logins)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    watcher.join()
+    
+    accepted = sum(1 for result in results if result)
+    return accepted / elapsed, results.count(None), max(stalls) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=32, help='Concurrent request threads')
+    parser.add_argument('--logins', type=int, default=200)
+    parser.add_argument('--method', default='scrypt')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--queue', type=int, default=1000, help='PASSWORD_HASH_QUEUE, lower it to see 503s')
+    args = parser.parse_args()
+    
+    password_hash = generate_password_hash('correct horse battery staple', args.method)
+    cores = os.cpu_count() or 1
+    print(f"{args.method}, {args.threads} threads, {args.logins} logins, {cores} cores\n")
+    print(f"{'mode':<16}{'logins/s':>10}{'per core':>10}{'rejected':>10}{'worst stall':>14}")
+    
+    for mode, workers in (('inline', 0), (f'pool x{args.workers}', args.workers)):
+        app = Flask(__name__)
+        app.config.update(
+            PASSWORD_HASH_METHOD=args.method,
+            PASSWORD_HASH_WORKERS=workers,
+            PASSWORD_HASH_QUEUE=args.queue
+        )
+        rate, rejected, stall = measure(app, args.threads, args.logins, password_hash)
+        print(f"{mode:<16}{rate:>10.1f}{rate / cores:>10.1f}{rejected:>10}{stall:>11.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
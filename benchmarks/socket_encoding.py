@@ -0,0 +1,72 @@
+"""Auction state encoding benchmark
+
+Compares the json, compact and msgpack encodings of a ``new_bid`` snapshot:
+bytes on the wire per message (as a Socket.IO packet) and the cost of
+encoding it for 10k recipients, both when the packet is encoded once per
+state room (what AuctionBroadcaster does) and once per recipient.
+    
+    python benchmarks/socket_encoding.py --recipients 10000
+"""
+
+import argparse
+import os
+import sys
+import timeit
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from socketio import packet  # noqa: E402
+from app.utils.socket_encoding import SocketEncoding  # noqa: E402
+
+
+def sample_state():
+    now = datetime.utcnow()
+    return {
+        'auction_id': 1842,
+        'seq': 12873,
+        'current_price': 48250.0,
+        'bid_amount': 48250.0,
+        'user_id': 90311,
+        'timestamp': now.isoformat(),
+        'bid_count': 214,
+        'ends_at': (now + timedelta(minutes=3)).isoformat()
+    }
+
+
+def wire_size(encoded):
+    """Bytes sent for one Socket.IO EVENT packet, binary attachments included"""
+    frames = packet.Packet(packet.EVENT, data=['new_bid', encoded]).encode()
+    if not isinstance(frames, list):
+        frames = [frames]
+    return sum(len(frame.encode() if isinstance(frame, str) else frame) for frame in frames)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--recipients', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    
+    state = sample_state()
+    print(f"{'encoding':<10}{'bytes/msg':>12}{'egress':>14}{'encode once':>16}{'encode per recipient':>24}")
+    
+    for encoding in SocketEncoding.available():
+        encoded = SocketEncoding.encode_state(state, encoding)
+        size = wire_size(encoded)
+        
+        def encode_once():
+            data = SocketEncoding.encode_state(state, encoding)
+            packet.Packet(packet.EVENT, data=['new_bid', data]).encode()
+        
+        once = min(timeit.repeat(encode_once, number=1000, repeat=args.repeat)) / 1000
+        per_recipient = once * args.recipients
+        egress_kb = size * args.recipients / 1024
+        
+        print(f"{encoding:<10}{size:>12}{egress_kb:>11.0f} KB{once * 1e6:>13.1f} us{per_recipient * 1000:>21.1f} ms")
+    
+    print(f"\nEgress and per-recipient cost are for one snapshot sent to {args.recipients} recipients")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+"""Socket.IO fan-out benchmark
+
+Measures how long a ``new_bid`` emit takes to reach every client joined to
+an auction room.
+
+Start the server in the async mode under test (the database settings from
+``.env`` are used as for run.py)::
+    
+    SOCKETIO_ASYNC_MODE=eventlet python benchmarks/socket_fanout.py server --port 5001
+
+Then open the clients from another shell (needs aiohttp, see dev-packages)::
+    
+    python benchmarks/socket_fanout.py clients --url http://localhost:5001 --clients 10000
+
+Raise the open file limit first (``ulimit -n 65536``) on both sides.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def run_server(args):
+    """Run the app with a bench-only event that triggers a room emit"""
+    mode = os.getenv('SOCKETIO_ASYNC_MODE', 'threading')
+    if mode == 'eventlet':
+        import eventlet
+        eventlet.monkey_patch()
+        from psycogreen.eventlet import patch_psycopg
+        patch_psycopg()
+    elif mode == 'gevent':
+        from gevent import monkey
+        monkey.patch_all()
+        from psycogreen.gevent import patch_psycopg
+        patch_psycopg()
+    
+    from dotenv import load_dotenv
+    load_dotenv()
+    
+    from app import create_app, socketio
+    
+    app = create_app(os.getenv('FLASK_ENV', 'development'))
+    
+    @socketio.on('bench_emit')
+    def on_bench_emit(data):
+        socketio.emit('new_bid', {
+            'auction_id': data['auction_id'],
+            'bid_amount': data.get('bid_amount', 0),
+            'sent_at': time.time()
+        }, room=f"auction_{data['auction_id']}")
+    
+    print(f"Benchmark server on port {args.port} (async_mode={mode})")
+    socketio.run(app, host='0.0.0.0', port=args.port, debug=False, use_reloader=False,
+                 allow_unsafe_werkzeug=True)
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run_clients(args):
+    """Connect the clients, fire emits and report delivery latency"""
+    import asyncio
+    import socketio
+    
+    latencies = []
+    received = {}
+    
+    async def open_client(index):
+        client = socketio.AsyncClient(reconnection=False)
+        auction_id = args.auction_id + index % args.auctions
+        
+        @client.on('new_bid')
+        async def on_new_bid(data):
+            latencies.append(time.time() - data['sent_at'])
+            received[data['bid_amount']] = received.get(data['bid_amount'], 0) + 1
+        
+        await client.connect(args.url, transports=['websocket'])
+        await client.emit('join_auction', {'auction_id': auction_id})
+        return client
+    
+    clients = []
+    started = time.monotonic()
+    for offset in range(0, args.clients, args.batch):
+        batch = range(offset, min(offset + args.batch, args.clients))
+        results = await asyncio.gather(*(open_client(i) for i in batch), return_exceptions=True)
+        for result in results:
+            if isinstance(result, Exception):
+                print(f"Connect failed: {result}")
+            else:
+                clients.append(result)
+    print(f"Connected {len(clients)}/{args.clients} clients in {time.monotonic() - started:.1f}s")
+    
+    # Let the last joins land before the first emit
+    await asyncio.sleep(2)
+    
+    trigger = clients[0]
+    for round_number in range(1, args.rounds + 1):
+        for auction_offset in range(args.auctions):
+            await trigger.emit('bench_emit', {
+                'auction_id': args.auction_id + auction_offset,
+                'bid_amount': round_number
+            })
+        await asyncio.sleep(args.interval)
+    await asyncio.sleep(2)
+    
+    expected = len(clients) * args.rounds
+    print(f"Delivered {len(latencies)}/{expected} new_bid events")
+    if latencies:
+        for label, pct in (('p50', 50), ('p95', 95), ('p99', 99)):
+            print(f"  {label}: {percentile(latencies, pct) * 1000:.1f} ms")
+        print(f"  max: {max(latencies) * 1000:.1f} ms")
+    
+    await asyncio.gather(*(client.disconnect() for client in clients), return_exceptions=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest='command', required=True)
+    
+    server = sub.add_parser('server', help='Run the app with the bench_emit event')
+    server.add_argument('--port', type=int, default=5001)
+    
+    clients = sub.add_parser('clients', help='Open clients and measure fan-out')
+    clients.add_argument('--url', default='http://localhost:5001')
+    clients.add_argument('--clients', type=int, default=10000)
+    clients.add_argument('--auctions', type=int, default=1, help='Spread clients over this many rooms')
+    clients.add_argument('--auction-id', type=int, default=1, help='First auction ID')
+    clients.add_argument('--rounds', type=int, default=10, help='Emits per room')
+    clients.add_argument('--interval', type=float, default=1.0, help='Seconds between rounds')
+    clients.add_argument('--batch', type=int, default=200, help='Concurrent connection attempts')
+    
+    args = parser.parse_args()
+    if args.command == 'server':
+        run_server(args)
+    else:
+        import asyncio
+        asyncio.run(run_clients(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,24 @@
 import os
 from dotenv import load_dotenv
-from app import create_app, socketio
 
 load_dotenv()
+
+# Green-thread servers must patch the standard library (and psycopg2, which
+# blocks in C) before anything else is imported
+ASYNC_MODE = os.getenv('SOCKETIO_ASYNC_MODE', 'threading')
+if ASYNC_MODE == 'eventlet':
+    import eventlet
+    eventlet.monkey_patch()
+    from psycogreen.eventlet import patch_psycopg
+    patch_psycopg()
+elif ASYNC_MODE == 'gevent':
+    from gevent import monkey
+    monkey.patch_all()
+    from psycogreen.gevent import patch_psycopg
+    patch_psycopg()
+
+from app import create_app, socketio
+
 app = create_app(os.getenv('FLASK_ENV', 'development'))
 
 if __name__ == '__main__':
@@ -0,0 +1,85 @@
+"""Shared fixtures
+
+The tests need a PostgreSQL server (TEST_DATABASE_URL, defaulting to the
+TestingConfig database) and use fakeredis in place of Redis.
+"""
+
+import os
+import socket
+import threading
+
+os.environ.setdefault('SKIP_SCHEDULER', '1')
+os.environ.setdefault('SKIP_OUTBOX_DISPATCHER', '1')
+
+import pytest  # noqa: E402
+from sqlalchemy import create_engine, text  # noqa: E402
+from config import TestingConfig, config  # noqa: E402
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture(scope='session')
+def database_url():
+    url = os.getenv('TEST_DATABASE_URL', TestingConfig.SQLALCHEMY_DATABASE_URI)
+    engine = create_engine(url)
+    try:
+        with engine.connect() as connection:
+            connection.execute(text('SELECT 1'))
+    except Exception as e:
+        pytest.skip(f'PostgreSQL is not available: {e}')
+    finally:
+        engine.dispose()
+    return url
+
+
+@pytest.fixture(scope='session')
+def redis_url():
+    """A fakeredis server shared by every app in the session"""
+    fakeredis = pytest.importorskip('fakeredis')
+    port = free_port()
+    server = fakeredis.TcpFakeServer(('127.0.0.1', port), server_type='redis')
+    # The Socket.IO queue listeners stay connected until the process exits
+    server.daemon_threads = True
+    server.block_on_close = False
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f'redis://127.0.0.1:{port}/0'
+
+
+@pytest.fixture
+def make_app(database_url, redis_url):
+    """Build apps from TestingConfig with per-test overrides"""
+    from app import create_app, db, socketio
+    created = []
+    
+    def factory(**overrides):
+        name = f'test_{len(config)}'
+        settings = {
+            'SQLALCHEMY_DATABASE_URI': database_url,
+            'REDIS_URL': redis_url,
+            'RATELIMIT_STORAGE_URI': 'memory://',
+            'RATELIMIT_ENABLED': False,
+        }
+        settings.update(overrides)
+        config[name] = type('Config', (TestingConfig,), settings)
+        # init_app keeps the queue manager of the previous app unless replaced
+        socketio.server_options.pop('client_manager', None)
+        app = create_app(name)
+        created.append(app)
+        return app
+    
+    # Start every test from empty tables
+    engine = create_engine(database_url)
+    db.metadata.drop_all(engine)
+    engine.dispose()
+    
+    yield factory
+    
+    for app in created:
+        with app.app_context():
+            db.session.remove()
+            for engine in db.engines.values():
+                engine.dispose()
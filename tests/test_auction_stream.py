@@ -0,0 +1,48 @@
+"""SSE streams miss no update published while they open"""
+
+import json
+from datetime import datetime, timedelta
+
+from app import db
+from app.models.auction import Auction
+from app.models.user import User
+from app.utils.auction_broadcaster import AuctionBroadcaster
+from app.utils.auction_stream import AuctionStreamHub
+
+
+def test_update_published_while_stream_opens_is_delivered_once(make_app, monkeypatch):
+    app = make_app()
+    with app.app_context():
+        seller = User(username='seller', email='seller@example.com', role='seller', password_hash='x')
+        db.session.add(seller)
+        db.session.flush()
+        auction = Auction(title='Car', description='d', starting_price=1000, current_price=1000,
+                          brand='b', car_model='m', year=2020, seller_id=seller.id,
+                          ends_at=datetime.utcnow() + timedelta(days=1))
+        db.session.add(auction)
+        db.session.commit()
+        auction_id = auction.id
+    
+    snapshot = AuctionBroadcaster.snapshot
+    
+    def snapshot_during_bids(auction):
+        # Updates the snapshot covers and one that lands just after it was read
+        state = snapshot(auction)
+        AuctionStreamHub._fan_out(auction_id, dict(state))
+        AuctionStreamHub._fan_out(auction_id, dict(state, seq=state['seq'] + 1, current_price=2000))
+        return state
+    
+    monkeypatch.setattr(AuctionBroadcaster, 'snapshot', staticmethod(snapshot_during_bids))
+    
+    response = app.test_client().get(f'/api/auctions/{auction_id}/stream')
+    assert response.status_code == 200
+    events = (chunk.decode() for chunk in response.response)
+    try:
+        assert next(events).startswith('retry:')
+        assert 'event: snapshot' in next(events)
+        update = next(events)
+        assert 'event: new_bid' in update
+        assert json.loads(update.split('data: ', 1)[1])['current_price'] == 2000
+    finally:
+        response.close()
+    assert AuctionStreamHub.client_count() == 0
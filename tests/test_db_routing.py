@@ -0,0 +1,109 @@
+"""Read-only requests go to replicas, writes and pinned clients to the primary"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session
+
+from app import db
+from app.models.auction import Auction
+from app.models.user import User
+from app.utils.db_routing import ReplicaRouter
+from app.utils.redis_client import RedisClient
+
+
+@pytest.fixture(scope='session')
+def replica_url(database_url):
+    """A second database on the same server standing in for a replica"""
+    url = make_url(database_url)
+    name = f'{url.database}_replica'
+    engine = create_engine(url, isolation_level='AUTOCOMMIT')
+    with engine.connect() as connection:
+        exists = connection.execute(text('SELECT 1 FROM pg_database WHERE datname = :name'), {'name': name}).scalar()
+        if not exists:
+            connection.execute(text(f'CREATE DATABASE "{name}"'))
+    engine.dispose()
+    return url.set(database=name).render_as_string(hide_password=False)
+
+
+@pytest.fixture
+def app(make_app, replica_url, monkeypatch):
+    # Lag is set by the tests instead of the background check
+    monkeypatch.setattr(ReplicaRouter, '_monitor', object())
+    monkeypatch.setattr(ReplicaRouter, '_lag', {'replica_0': 0.0})
+    app = make_app(SQLALCHEMY_BINDS={'replica_0': replica_url}, DB_REPLICA_MAX_LAG_SECONDS=5)
+    
+    with app.app_context():
+        replica = db.engines['replica_0']
+        db.metadata.drop_all(replica)
+        db.metadata.create_all(replica)
+        add_auction(db.session, 'Primary car')
+        db.session.commit()
+        with Session(replica) as session:
+            add_auction(session, 'Replica car')
+            session.commit()
+        RedisClient.get_client().flushdb()
+    return app
+
+
+def add_auction(session, title):
+    seller = User(username='seller', email='seller@example.com', role='seller', password_hash='x')
+    session.add(seller)
+    session.flush()
+    session.add(Auction(title=title, description='d', starting_price=1000, current_price=1000,
+                        brand='b', car_model='m', year=2020, seller_id=seller.id,
+                        ends_at=datetime.utcnow() + timedelta(days=1)))
+
+
+def listed_titles(client):
+    response = client.get('/api/auctions')
+    assert response.status_code == 200
+    return [auction['title'] for auction in response.get_json()['data']['auctions']]
+
+
+def test_get_request_reads_from_replica(app):
+    assert listed_titles(app.test_client()) == ['Replica car']
+    
+    with app.test_request_context('/api/auctions', method='GET'):
+        ReplicaRouter.before_request()
+        assert db.session.get_bind(clause=select(Auction)) is db.engines['replica_0']
+
+
+def test_writes_and_reads_after_flush_use_primary(app):
+    with app.test_request_context('/api/auctions', method='POST'):
+        ReplicaRouter.before_request()
+        assert db.session.get_bind(clause=select(Auction)) is db.engine
+    
+    with app.test_request_context('/api/auctions', method='GET'):
+        ReplicaRouter.before_request()
+        assert db.session.get_bind(clause=select(Auction)) is db.engines['replica_0']
+        assert db.session.get_bind(clause=select(Auction).with_for_update()) is db.engine
+        
+        db.session.add(User(username='bidder', email='bidder@example.com', password_hash='x'))
+        db.session.flush()
+        assert db.session.get_bind(clause=select(Auction)) is db.engine
+        db.session.rollback()
+
+
+def test_committed_write_pins_client_to_primary(app):
+    client = app.test_client()
+    with app.test_request_context('/api/auctions', method='GET'):
+        ReplicaRouter.before_request()
+        db.session.add(User(username='bidder', email='bidder@example.com', password_hash='x'))
+        db.session.commit()
+        assert RedisClient.get_client().exists(f'db_sticky:{ReplicaRouter._client_key()}')
+    
+    assert listed_titles(client) == ['Primary car']
+    
+    RedisClient.get_client().flushdb()
+    assert listed_titles(client) == ['Replica car']
+
+
+def test_lagging_replica_is_skipped(app):
+    ReplicaRouter._lag['replica_0'] = 6.0
+    assert listed_titles(app.test_client()) == ['Primary car']
+    
+    ReplicaRouter._lag['replica_0'] = None  # unreachable
+    assert listed_titles(app.test_client()) == ['Primary car']
@@ -0,0 +1,31 @@
+"""Tokens issued before a committed claims change are rejected"""
+
+import math
+import time
+
+from flask_jwt_extended import create_access_token, decode_token
+
+from app import db
+from app.models.user import User
+from app.utils.jwt_blacklist import JWTBlacklist
+
+
+def test_token_issued_before_commit_is_revoked(make_app):
+    app = make_app()
+    with app.app_context():
+        user = User(username='buyer', email='buyer@example.com', role='buyer', password_hash='x')
+        db.session.add(user)
+        db.session.commit()
+        
+        user.role = 'seller'
+        db.session.flush()
+        # e.g. a refresh served between the flush and the commit
+        token = decode_token(create_access_token(identity=str(user.id), additional_claims={'role': 'buyer'}))
+        db.session.commit()
+        changed_at = time.time()
+        assert JWTBlacklist.is_token_revoked(token)
+        
+        # Tokens carry whole seconds, the first one clear of the change is valid
+        time.sleep(math.ceil(changed_at) - time.time() + 0.01)
+        token = decode_token(create_access_token(identity=str(user.id), additional_claims={'role': 'seller'}))
+        assert not JWTBlacklist.is_token_revoked(token)
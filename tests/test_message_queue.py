@@ -0,0 +1,71 @@
+"""Socket.IO events reach clients connected to other nodes through the message queue"""
+
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+import socketio as socketio_client
+from werkzeug.serving import make_server
+
+from app import db
+from app.models.auction import Auction
+from app.models.user import User
+
+
+def serve(app):
+    """Run an app on a free local port, returns the server"""
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def wait_for(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def test_emit_on_one_node_reaches_client_of_another(make_app, redis_url):
+    queue = redis_url.rsplit('/', 1)[0] + '/1'
+    node_a = make_app(SOCKETIO_MESSAGE_QUEUE=queue, NODE_ID='node-a')
+    node_b = make_app(SOCKETIO_MESSAGE_QUEUE=queue, NODE_ID='node-b')
+    
+    with node_a.app_context():
+        seller = User(username='seller', email='seller@example.com', role='seller')
+        seller.set_password('password123')
+        db.session.add(seller)
+        db.session.flush()
+        auction = Auction(title='Car', description='d', starting_price=1000, current_price=1000,
+                          brand='b', car_model='m', year=2020, seller_id=seller.id,
+                          ends_at=datetime.utcnow() + timedelta(days=1))
+        db.session.add(auction)
+        db.session.commit()
+        auction_id = auction.id
+    
+    # Each app keeps the Socket.IO server it was initialised with
+    server_a = node_a.wsgi_app.engineio_app
+    server_b = node_b.wsgi_app.engineio_app
+    assert server_a is not server_b
+    
+    http_b = serve(node_b)
+    client = socketio_client.Client()
+    received, joined = [], threading.Event()
+    client.on('auction_status_changed', lambda data: received.append(data))
+    client.on('auction_joined', lambda data: joined.set())
+    try:
+        client.connect(f'http://127.0.0.1:{http_b.server_port}', transports=['polling'])
+        client.emit('join_auction', {'auction_id': auction_id})
+        assert joined.wait(5)
+        
+        status = {'auction_id': auction_id, 'status': 'ended'}
+        server_a.emit('auction_status_changed', status, room=f'auction_{auction_id}')
+        
+        assert wait_for(lambda: received)
+        assert received == [status]
+    finally:
+        client.disconnect()
+        http_b.shutdown()
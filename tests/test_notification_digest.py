@@ -0,0 +1,34 @@
+"""The last update of a digest burst is pushed after the throttle interval"""
+
+import time
+from datetime import datetime, timedelta
+
+from app import db
+from app.models.auction import Auction
+from app.models.user import User
+from app.utils.notification_service import NotificationService
+
+
+def test_trailing_push_carries_the_final_count(make_app, monkeypatch):
+    app = make_app(NOTIFICATION_DIGEST_EMIT_INTERVAL=0.5)
+    pushed = []
+    monkeypatch.setattr(NotificationService, 'emit_to_user',
+                        staticmethod(lambda notification: pushed.append(notification.digest_count)))
+    
+    with app.app_context():
+        seller = User(username='seller', email='seller@example.com', role='seller', password_hash='x')
+        db.session.add(seller)
+        db.session.flush()
+        auction = Auction(title='Car', description='d', starting_price=1000, current_price=1000,
+                          brand='b', car_model='m', year=2020, seller_id=seller.id,
+                          ends_at=datetime.utcnow() + timedelta(days=1))
+        db.session.add(auction)
+        db.session.commit()
+        for _ in range(3):
+            NotificationService.upsert_digest(seller.id, 'bid_placed', 'New bid', 'A bid was placed',
+                                              ' bids were placed', auction.id)
+    
+    # The first update is pushed at once, the other two within the interval
+    assert pushed == [1]
+    time.sleep(1)
+    assert pushed == [1, 3]
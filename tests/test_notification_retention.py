@@ -0,0 +1,65 @@
+"""Expired notifications leave the live table, wherever they were stored"""
+
+from datetime import datetime
+
+import pytest
+from sqlalchemy import text
+
+from app import db
+from app.models.notification import Notification
+from app.models.user import User
+from app.utils.notification_retention import NotificationRetentionService, _add_months, _month_start
+
+ARCHIVE_SCHEMA = 'Notification Archive'
+
+
+@pytest.fixture
+def app(make_app):
+    app = make_app(NOTIFICATION_RETENTION_MONTHS=6, NOTIFICATION_PURGE_BATCH_SIZE=2,
+                   NOTIFICATION_ARCHIVE_SCHEMA=ARCHIVE_SCHEMA)
+    with app.app_context():
+        drop_archive()
+        user = User(username='buyer', email='buyer@example.com', password_hash='x')
+        db.session.add(user)
+        db.session.flush()
+        
+        this_month = _month_start(datetime.utcnow())
+        # One expired monthly partition; older rows fall into the default one
+        NotificationRetentionService.ensure_partitions(_add_months(this_month, -8))
+        for months_ago in [8, 12, 12, 13, 14, 20, 0]:
+            db.session.add(Notification(user_id=user.id, type='outbid', title='t', message='m',
+                                        created_at=_add_months(this_month, -months_ago)))
+        db.session.commit()
+    yield app
+    with app.app_context():
+        drop_archive()
+
+
+def drop_archive():
+    db.session.execute(text(f'DROP SCHEMA IF EXISTS "{ARCHIVE_SCHEMA}" CASCADE'))
+    db.session.commit()
+
+
+def live_rows():
+    return Notification.query.count()
+
+
+def test_retention_drops_partitions_and_purges_default_partition(app):
+    with app.app_context():
+        expired = NotificationRetentionService.apply_retention()
+        
+        assert NotificationRetentionService.partition_name(_add_months(_month_start(datetime.utcnow()), -8)) in expired
+        assert live_rows() == 1
+
+
+def test_retention_archives_to_a_schema_that_needs_quoting(app):
+    app.config['NOTIFICATION_ARCHIVE_ENABLED'] = True
+    with app.app_context():
+        expired = NotificationRetentionService.apply_retention()
+        
+        assert live_rows() == 1
+        archived = db.session.execute(text(
+            f'SELECT COUNT(*) FROM "{ARCHIVE_SCHEMA}".{NotificationRetentionService.DEFAULT_PARTITION}'
+        )).scalar()
+        assert archived == 5
+        assert db.session.execute(text(f'SELECT COUNT(*) FROM "{ARCHIVE_SCHEMA}".{expired[0]}')).scalar() == 1
@@ -0,0 +1,39 @@
+"""A hash that outlives its caller keeps its slot in the pool"""
+
+import time
+
+import pytest
+from flask import Flask
+
+from app.utils.password_hasher import PasswordHasher, PasswordHashingBusy
+
+
+@pytest.fixture
+def hasher(monkeypatch):
+    for name, value in [('_executor', None), ('_slots', None), ('_green', None), ('_inflight', 0)]:
+        monkeypatch.setattr(PasswordHasher, name, value)
+    PasswordHasher.start({'PASSWORD_HASH_WORKERS': 1, 'PASSWORD_HASH_QUEUE': 0})
+    yield PasswordHasher
+    PasswordHasher._executor.shutdown(wait=True)
+
+
+def test_timed_out_hash_keeps_its_slot_until_it_finishes(hasher):
+    app = Flask(__name__)
+    app.config['PASSWORD_HASH_TIMEOUT'] = 0.2
+    with app.test_request_context():
+        with pytest.raises(PasswordHashingBusy):
+            hasher._run(time.sleep, 1)
+        
+        # Still hashing in the worker, so there is no room for another
+        with pytest.raises(PasswordHashingBusy):
+            hasher._run(int)
+        assert hasher._inflight == 1
+        
+        time.sleep(1)
+        assert hasher._run(int) == 0
+        assert hasher._inflight == 0
+
+
+def test_hashes_run_inline_outside_requests(hasher):
+    assert hasher._run(time.sleep, 0) is None
+    assert hasher._inflight == 0
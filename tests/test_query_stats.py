@@ -0,0 +1,39 @@
+"""Query budgets fail the request at the statement that goes over"""
+
+from datetime import datetime, timedelta
+
+from app import db
+from app.models.auction import Auction
+from app.models.user import User
+
+
+def test_over_budget_write_is_not_committed(make_app):
+    app = make_app(QUERY_BUDGETS={'auth.register': 2})
+    response = app.test_client().post('/api/auth/register', json={
+        'username': 'buyer', 'email': 'buyer@example.com', 'password': 'password123'
+    })
+    assert response.status_code == 500
+    assert 'budget is 2' in response.get_json()['error']
+    
+    with app.app_context():
+        assert User.query.count() == 0
+
+
+def test_full_listing_page_is_within_budget(make_app):
+    app = make_app()
+    with app.app_context():
+        seller = User(username='seller', email='seller@example.com', role='seller', password_hash='x')
+        db.session.add(seller)
+        db.session.flush()
+        db.session.add_all([
+            Auction(title=f'Car {i}', description='d', starting_price=1000, current_price=1000,
+                    brand='b', car_model='m', year=2020, seller_id=seller.id,
+                    ends_at=datetime.utcnow() + timedelta(days=1))
+            for i in range(100)
+        ])
+        db.session.commit()
+    
+    response = app.test_client().get('/api/auctions?per_page=100')
+    assert response.status_code == 200
+    assert len(response.get_json()['data']['auctions']) == 100
+    assert 'queries"' in response.headers['Server-Timing']
@@ -0,0 +1,63 @@
+"""The Redis circuit breaker opens when commands on open connections time out"""
+
+import socket
+import threading
+import time
+
+import pytest
+import redis
+
+from app.utils.redis_client import BreakerConnectionPool, BreakerRedis, CircuitBreaker, RedisUnavailable
+
+
+class HangingProxy:
+    """Relay to Redis until ``hang`` is set, then swallow every byte"""
+    
+    def __init__(self, target_port):
+        self.target_port = target_port
+        self.hang = threading.Event()
+        self.listener = socket.create_server(('127.0.0.1', 0))
+        self.port = self.listener.getsockname()[1]
+        threading.Thread(target=self._accept, daemon=True).start()
+    
+    def _accept(self):
+        while True:
+            client, _ = self.listener.accept()
+            upstream = socket.create_connection(('127.0.0.1', self.target_port))
+            threading.Thread(target=self._relay, args=(client, upstream), daemon=True).start()
+            threading.Thread(target=self._relay, args=(upstream, client), daemon=True).start()
+    
+    def _relay(self, source, destination):
+        while True:
+            data = source.recv(65536)
+            if not data:
+                return
+            if not self.hang.is_set():
+                destination.sendall(data)
+
+
+@pytest.fixture
+def proxy(redis_url):
+    return HangingProxy(int(redis_url.rsplit(':', 1)[1].split('/')[0]))
+
+
+def test_timeouts_on_established_connections_open_the_circuit(proxy):
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30)
+    pool = BreakerConnectionPool.from_url(f'redis://127.0.0.1:{proxy.port}/2', max_connections=2,
+                                          socket_timeout=0.2, breaker=breaker)
+    client = BreakerRedis(connection_pool=pool)
+    
+    assert client.set('key', 'value')
+    assert client.pipeline().get('key').execute() == [b'value']
+    assert breaker.state == CircuitBreaker.CLOSED
+    
+    proxy.hang.set()
+    for _ in range(3):
+        with pytest.raises(redis.TimeoutError):
+            client.get('key')
+    assert breaker.state == CircuitBreaker.OPEN
+    
+    started = time.monotonic()
+    with pytest.raises(RedisUnavailable):
+        client.get('key')
+    assert time.monotonic() - started < 0.1
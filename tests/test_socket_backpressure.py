@@ -0,0 +1,69 @@
+"""Slow connections get their packets in order, without superseded snapshots"""
+
+import json
+import time
+
+import engineio
+from engineio import packet
+from engineio.socket import Socket
+
+from app.utils.socket_limits import SocketBackpressure
+
+
+def connect(max_queue):
+    eio = engineio.Server(async_mode='threading')
+    eio.sockets['sid'] = socket = Socket(eio, 'sid')
+    SocketBackpressure.install(eio, max_queue)
+    return eio, socket
+
+
+def message(data):
+    return packet.Packet(packet.MESSAGE, data=data)
+
+
+def new_bid(auction_id, seq):
+    return message('2' + json.dumps(['new_bid', {'auction_id': auction_id, 'seq': seq}]))
+
+
+def read(socket):
+    """Packet data the client receives, in order"""
+    received = []
+    while not socket.queue.empty():
+        received.append(socket.queue.get_nowait().data)
+    return received
+
+
+def wait_for(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_held_packets_follow_in_order_with_newest_snapshot_only():
+    eio, socket = connect(max_queue=4)
+    for data in ['a', 'b', 'c', 'd']:
+        eio.send_packet('sid', message(data))
+    
+    # Queue is full: these wait, and seq 2 replaces seq 1
+    for pkt in [new_bid(1, 1), message('notification'), new_bid(2, 1), new_bid(1, 2)]:
+        eio.send_packet('sid', pkt)
+    assert socket.queue.qsize() == 4
+    
+    received = read(socket)
+    assert wait_for(lambda: 'sid' not in SocketBackpressure._backlogs)
+    received += read(socket)
+    assert received[:5] == ['a', 'b', 'c', 'd', 'notification']
+    assert [json.loads(data[1:])[1] for data in received[5:]] == [
+        {'auction_id': 2, 'seq': 1}, {'auction_id': 1, 'seq': 2}
+    ]
+
+
+def test_client_whose_backlog_fills_is_disconnected():
+    eio, socket = connect(max_queue=2)
+    for data in ['a', 'b', 'c', 'd']:
+        eio.send_packet('sid', message(data))
+    assert socket.closed
+    assert 'sid' not in SocketBackpressure._backlogs
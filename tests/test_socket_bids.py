@@ -0,0 +1,65 @@
+"""Socket.IO bids share the REST limit and stop once the token is revoked"""
+
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from flask_jwt_extended import create_access_token
+
+from app import db, socketio
+from app.models.auction import Auction
+from app.models.user import User
+from app.utils.jwt_blacklist import JWTBlacklist
+from app.utils.rate_limit import BID_RATE_LIMIT, hit_route_limit
+
+
+@pytest.fixture
+def app(make_app):
+    app = make_app(RATELIMIT_ENABLED=True)
+    with app.app_context():
+        seller = User(username='seller', email='seller@example.com', role='seller', password_hash='x')
+        bidder = User(username='bidder', email='bidder@example.com', role='buyer', password_hash='x')
+        db.session.add_all([seller, bidder])
+        db.session.flush()
+        auction = Auction(title='Car', description='d', starting_price=1000, current_price=1000,
+                          brand='b', car_model='m', year=2020, seller_id=seller.id,
+                          ends_at=datetime.utcnow() + timedelta(days=1))
+        db.session.add(auction)
+        db.session.commit()
+        app.bidder_id, app.auction_id = bidder.id, auction.id
+        app.token = create_access_token(identity=str(bidder.id), additional_claims={'role': 'buyer'})
+    return app
+
+
+def place_bid(client, app, amount):
+    return client.emit('place_bid', {'auction_id': app.auction_id, 'bid_amount': amount}, callback=True)
+
+
+def test_token_is_only_read_from_auth(app):
+    client = socketio.test_client(app, query_string=f'token={app.token}')
+    assert place_bid(client, app, 1500)['status'] == 401
+    
+    client = socketio.test_client(app, auth={'token': app.token})
+    assert place_bid(client, app, 1500)['success']
+
+
+def test_socket_bids_count_against_the_rest_limit(app):
+    with app.app_context():
+        for _ in range(30):
+            assert hit_route_limit(BID_RATE_LIMIT, 'bids.place_bid', f'user:{app.bidder_id}')
+    
+    client = socketio.test_client(app, auth={'token': app.token})
+    assert place_bid(client, app, 1500)['status'] == 429
+    
+    response = app.test_client().post(f'/api/bids/auction/{app.auction_id}', json={'bid_amount': 1500},
+                                      headers={'Authorization': f'Bearer {app.token}'})
+    assert response.status_code == 429
+
+
+def test_revoked_token_stops_bidding_on_open_socket(app):
+    client = socketio.test_client(app, auth={'token': app.token})
+    assert place_bid(client, app, 1500)['success']
+    
+    with app.app_context():
+        JWTBlacklist.revoke_claims(app.bidder_id, time.time())
+    assert place_bid(client, app, 1600)['status'] == 401
@@ -0,0 +1,36 @@
+"""Outbid notices go to the leader at the time of each bid"""
+
+from datetime import datetime, timedelta
+
+from app import db
+from app.models.auction import Auction
+from app.models.notification import Notification
+from app.models.user import User
+from app.utils.bid_service import BidService
+from app.utils.outbox import OutboxService
+
+
+def test_each_outbid_notice_goes_to_the_leader_it_replaced(make_app):
+    app = make_app()
+    with app.app_context():
+        users = [User(username=name, email=f'{name}@example.com', role=role, password_hash='x')
+                 for name, role in [('seller', 'seller'), ('a', 'buyer'), ('b', 'buyer'), ('c', 'buyer')]]
+        db.session.add_all(users)
+        db.session.flush()
+        seller, a, b, c = (user.id for user in users)
+        auction = Auction(title='Car', description='d', starting_price=1000, current_price=1000,
+                          brand='b', car_model='m', year=2020, seller_id=seller,
+                          ends_at=datetime.utcnow() + timedelta(days=1))
+        db.session.add(auction)
+        db.session.commit()
+        auction_id = auction.id
+        
+        # All three bids commit before the dispatcher delivers any of them
+        for user_id, amount in [(a, 2000), (b, 3000), (c, 4000)]:
+            bid, error, status = BidService.place_bid(auction_id, user_id, {'bid_amount': amount})
+            assert status == 201, error
+        while OutboxService.dispatch_batch():
+            pass
+        
+        outbid = Notification.query.filter_by(type='outbid').order_by(Notification.id).all()
+        assert [notification.user_id for notification in outbid] == [a, b]